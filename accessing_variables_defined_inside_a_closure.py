@@ -38,4 +38,164 @@ n= 10
 >>> f.get_n()
 10
 >>>
-"""
\ No newline at end of file
+"""
+
+"""
+Writing a pair of accessor functions for every variable quickly gets tedious. Since
+Python 3.7 the cells in which a closure keeps its nonlocal variables are writable, so
+all of them can be exposed at once. closure_state() looks up the names in
+__code__.co_freevars and generates a small class with a property for each cell:
+"""
+
+from threading import Lock
+
+# Locks are striped over the cells, so that every accessor object for the same closure
+# uses the same lock for the same variable
+_locks = [Lock() for _ in range(64)]
+
+_state_classes = {}
+
+
+def _state_class(names):
+    try:
+        return _state_classes[names]
+    except KeyError:
+        pass
+    # The properties share the class namespace with the slots and methods
+    for name in names:
+        if name.startswith('_cell_') or hasattr(_ClosureStateBase, name):
+            raise ValueError('closure variable {!r} clashes with a ClosureState '
+                             'attribute'.format(name))
+    slots = tuple('_cell_' + name for name in names)
+    lines = ['def make(base):',
+             '    class ClosureState(base):',
+             '        __slots__ = {!r}'.format(slots)]
+    for name, slot in zip(names, slots):
+        lines += ['        @property',
+                  '        def {}(self):'.format(name),
+                  '            return self.{}.cell_contents'.format(slot),
+                  '        @{}.setter'.format(name),
+                  '        def {}(self, value):'.format(name),
+                  '            self.{}.cell_contents = value'.format(slot)]
+    lines.append('    return ClosureState')
+    namespace = {}
+    exec('\n'.join(lines), namespace)
+    cls = _state_classes[names] = namespace['make'](_ClosureStateBase)
+    return cls
+
+
+class _ClosureStateBase:
+    __slots__ = ('_cells',)
+
+    def __init__(self, cells):
+        self._cells = cells
+        for name, cell in cells.items():
+            setattr(self, '_cell_' + name, cell)
+
+    def incr(self, name, n=1):
+        """
+        Atomically add n to a variable and return the new value
+        """
+        cell = self._cells[name]
+        with _locks[(id(cell) >> 4) & 63]:
+            value = cell.cell_contents = cell.cell_contents + n
+        return value
+
+    def __iter__(self):
+        return iter(self._cells)
+
+    def vars(self):
+        # Unassigned cells are left out
+        values = {}
+        for name, cell in self._cells.items():
+            try:
+                values[name] = cell.cell_contents
+            except ValueError:
+                pass
+        return values
+
+    def __repr__(self):
+        return '<closure state {}>'.format(
+            ', '.join('{}={!r}'.format(k, v) for k, v in self.vars().items()))
+
+
+def closure_state(func):
+    """
+    Return an object giving attribute access to the nonlocal variables of a closure
+    """
+    names = func.__code__.co_freevars
+    if not names:
+        raise TypeError('{!r} is not a closure'.format(func))
+    return _state_class(names)(dict(zip(names, func.__closure__)))
+
+"""
+Here is how it works with the sample() function from above:
+>>> f = sample()
+>>> state = closure_state(f)
+>>> state
+<closure state n=0>
+>>> state.n = 10
+>>> f()
+n= 10
+>>> state.incr('n', 5)
+15
+>>> f.get_n()
+15
+>>> state.m = 1
+Traceback (most recent call last):
+...
+AttributeError: 'ClosureState' object has no attribute 'm'
+>>>
+
+Only the variables that the function itself refers to appear in co_freevars. Reading
+a variable that has not been assigned yet raises ValueError, just like accessing the
+cell_contents of an empty cell. incr() is atomic with respect to other incr() calls,
+but not with respect to code inside the closure doing nonlocal n; n += 1.
+
+Going through a property and a cell costs more than a plain attribute: in _benchmark()
+reads and writes take roughly two to three times as long as on a __slots__ or regular
+instance. That is still much cheaper than calling accessor functions, but for counters
+that are updated on a really hot path, an instance with __slots__ remains the faster
+choice.
+"""
+
+
+def _benchmark(number=1000000):
+    from timeit import timeit
+
+    class Slotted:
+        __slots__ = ('n',)
+
+        def __init__(self):
+            self.n = 0
+
+    class Plain:
+        def __init__(self):
+            self.n = 0
+
+    def counter():
+        n = 0
+
+        def func():
+            return n
+        return func
+
+    lock = Lock()
+
+    def incr(obj, n=1):
+        with lock:
+            obj.n += n
+
+    for label, obj in (('closure cells', closure_state(counter())),
+                       ('__slots__', Slotted()),
+                       ('dict', Plain())):
+        add = obj.incr if label == 'closure cells' else None
+        results = [timeit(lambda: obj.n, number=number),
+                   timeit(lambda: setattr(obj, 'n', 1), number=number),
+                   timeit(lambda: add('n') if add else incr(obj), number=number)]
+        print('{:14} read {:.3f}  write {:.3f}  locked incr {:.3f} usec'.format(
+            label, *[t / number * 1e6 for t in results]))
+
+
+if __name__ == '__main__':
+    _benchmark()
@@ -0,0 +1,435 @@
+"""
+Benchmarks for the hot paths of the recipes.
+
+Every run times each benchmark, saves the results as JSON and compares them with a
+baseline run, flagging anything that got slower by more than a threshold:
+
+    python benchmarks.py                      # run everything, compare with the baseline
+    python benchmarks.py -k flatten -k queue  # only benchmarks with these in their name
+    python benchmarks.py --save-baseline      # run and make the results the new baseline
+    python benchmarks.py --threshold 0.2      # only flag slowdowns of more than 20%
+    python benchmarks.py --compare .benchmarks/20240101-120000.json
+
+Results go to .benchmarks/<timestamp>.json, the baseline is .benchmarks/baseline.json.
+The exit status is 1 if any benchmark regressed, so the script can be used in CI.
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import sys
+import time
+from timeit import Timer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(HERE, '.benchmarks')
+BASELINE = os.path.join(RESULTS_DIR, 'baseline.json')
+
+_modules = {}
+
+
+def load(filename):
+    """
+    Import a recipe by its file name. Some of the file names aren't valid module names,
+    and most recipes print examples when imported, so this goes through importlib with
+    stdout silenced.
+    """
+    try:
+        return _modules[filename]
+    except KeyError:
+        pass
+    name = 'cookbook_' + re.sub(r'\W', '_', os.path.splitext(filename)[0])
+    spec = importlib.util.spec_from_file_location(name, os.path.join(HERE, filename))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    with contextlib.redirect_stdout(io.StringIO()):
+        spec.loader.exec_module(module)
+    _modules[filename] = module
+    return module
+
+
+# name -> (setup function, operations per call)
+BENCHMARKS = {}
+
+
+def benchmark(name, ops=1):
+    """
+    Register a benchmark. The decorated function does the setup and returns the
+    callable to time; ops is the number of operations that callable performs, so that
+    results are reported per operation.
+    """
+    def register(setup):
+        BENCHMARKS[name] = (setup, ops)
+        return setup
+    return register
+
+
+# Tree
+
+def _tree_data(n):
+    rnd = random.Random(n)
+    return [{'id': i, 'title': 'Category #{}'.format(i),
+             'parent_id': rnd.randrange(1, i) if i > 1 else None} for i in range(1, n + 1)]
+
+
+@benchmark('tree.build', ops=200)
+def _():
+    Tree = load('memory_management_in_cyclic_data_structures(tree).py').Tree
+    data = _tree_data(200)
+    return lambda: Tree(items=data)
+
+
+@benchmark('tree.descendants', ops=1000)
+def _():
+    Tree = load('memory_management_in_cyclic_data_structures(tree).py').Tree
+    tree = Tree(items=_tree_data(1000))
+    root = tree.nodes[0]
+    return lambda: sum(1 for _ in Tree.descendants(root)) + 1
+
+
+@benchmark('tree.ancestors')
+def _():
+    Tree = load('memory_management_in_cyclic_data_structures(tree).py').Tree
+    tree = Tree(items=_tree_data(1000))
+    leaf = tree.nodes[-1]
+    return lambda: Tree.ancestors(leaf)
+
+
+# Cached instances
+
+@benchmark('cached.lookup')
+def _():
+    Cached = load('cached_instances.py').Cached
+
+    class Spam(metaclass=Cached):
+        def __init__(self, name):
+            self.name = name
+
+    # The cache only holds weak references, so the timed function keeps the instance
+    # alive; otherwise every call would create a new one
+    keep = Spam('Guido')
+    return lambda: keep and Spam('Guido')
+
+
+# Priority queue
+
+@benchmark('priority_queue.push_pop', ops=2000)
+def _():
+    PriorityQueue = load('priority_queue.py').PriorityQueue
+    rnd = random.Random(0)
+    priorities = [rnd.random() for _ in range(1000)]
+
+    def run():
+        q = PriorityQueue()
+        for p in priorities:
+            q.push(p, p)
+        for _ in priorities:
+            q.pop()
+    return run
+
+
+# Sorted containers
+
+@benchmark('sorted_items.add', ops=1000)
+def _():
+    SortedItems = load('implementing_custom_containers.py').SortedItems
+    rnd = random.Random(0)
+    values = [rnd.random() for _ in range(1000)]
+
+    def run():
+        items = SortedItems()
+        for value in values:
+            items.add(value)
+    return run
+
+
+# Flattening
+
+def _nested(depth, width):
+    if depth == 0:
+        return list(range(width))
+    return [_nested(depth - 1, width), 'text', (1, 2)] * (width // 3)
+
+
+@benchmark('flatten.recursive', ops=1000)
+def _():
+    flatten = load('flattening_nested_sequence.py').flatten
+    items = _nested(3, 10)
+    return lambda: sum(1 for _ in flatten(items))
+
+
+@benchmark('flatten.iflatten', ops=1000)
+def _():
+    iflatten = load('flattening_nested_sequence.py').iflatten
+    items = _nested(3, 10)
+    return lambda: sum(1 for _ in iflatten(items))
+
+
+# Float ranges
+
+@benchmark('frange.iterate', ops=10000)
+def _():
+    frange = load('float_range.py').frange
+    return lambda: sum(frange(0.0, 1000.0, 0.1))
+
+
+@benchmark('float_range.iterate', ops=10000)
+def _():
+    FloatRange = load('float_range.py').FloatRange
+    r = FloatRange(0.0, 1000.0, 0.1)
+    return lambda: sum(r)
+
+
+# Type checking
+
+@benchmark('typed.set')
+def _():
+    Stock = load('type_checked.py').Stock
+    s = Stock('ACME', 50, 91.1)
+
+    def run():
+        s.shares = 75
+    return run
+
+
+@benchmark('typeassert.call')
+def _():
+    typeassert = load('type_checking_on_a_function_using_a_decorator.py').typeassert
+
+    @typeassert(int, z=int)
+    def spam(x, y, z=42):
+        pass
+    return lambda: spam(1, 2, 3)
+
+
+# Multiple dispatch
+
+@benchmark('multimethod.dispatch')
+def _():
+    multimethod = load('multiple_dispatch_with_function_annotations.py').multimethod
+
+    class Spam:
+        @multimethod
+        def bar(self, *args):
+            raise TypeError('No matching method for bar')
+
+        @bar.match(int, int)
+        def bar(self, x, y):
+            pass
+
+        @bar.match(str, int)
+        def bar(self, s, n=0):
+            pass
+
+    s = Spam()
+    return lambda: s.bar('a', 1)
+
+
+# Lazy properties
+
+@benchmark('lazyproperty.cached')
+def _():
+    lazyproperty = load('lazyproperty.py').lazyproperty
+
+    class Circle:
+        def __init__(self, radius):
+            self.radius = radius
+
+        @lazyproperty
+        def area(self):
+            return 3.14159 * self.radius ** 2
+
+    c = Circle(4.0)
+    c.area
+    return lambda: c.area
+
+
+@benchmark('lazyproperty.first_access')
+def _():
+    lazyproperty = load('lazyproperty.py').lazyproperty
+
+    class Circle:
+        def __init__(self, radius):
+            self.radius = radius
+
+        @lazyproperty
+        def area(self):
+            return 3.14159 * self.radius ** 2
+
+    return lambda: Circle(4.0).area
+
+
+# Wrapper overhead
+
+def _add(x, y):
+    return x + y
+
+
+@benchmark('call.undecorated')
+def _():
+    return lambda: _add(2, 3)
+
+
+@benchmark('logged.call')
+def _():
+    logged = load('decorator_that_takes_arguments.py').logged
+    add = logged(10)(_add)
+    return lambda: add(2, 3)
+
+
+@benchmark('logged_optional.call')
+def _():
+    logged = load('decorator_that_takes_optional_args.py').logged
+    add = logged(_add)
+    return lambda: add(2, 3)
+
+
+@benchmark('profiled.call')
+def _():
+    module = load('defining_decorators_as_classes.py')
+    add = module.Profiled(_add)
+    return lambda: add(2, 3)
+
+
+@benchmark('profiled.method_call')
+def _():
+    Profiled = load('defining_decorators_as_classes.py').Profiled
+
+    class Spam:
+        @Profiled
+        def bar(self, x):
+            return x
+
+    s = Spam()
+    return lambda: s.bar(1)
+
+
+@benchmark('profiled_closure.call')
+def _():
+    add = load('defining_decorators_as_classes.py').profiled(_add)
+    return lambda: add(2, 3)
+
+
+def run(names, repeat=5, min_time=0.2):
+    results = {}
+    for name in names:
+        setup, ops = BENCHMARKS[name]
+        timer = Timer(setup())
+        number, _ = timer.autorange()
+        # autorange() stops at 0.2s, scale up to the requested time per repeat
+        number = max(number, int(number * min_time / 0.2))
+        times = [t / number / ops * 1e6 for t in timer.repeat(repeat, number)]
+        results[name] = {
+            'usec': min(times),
+            'mean': sum(times) / len(times),
+            'number': number,
+            'repeat': repeat,
+            'ops': ops,
+        }
+        print('{:28} {:10.4f} usec/op'.format(name, results[name]['usec']), flush=True)
+    return results
+
+
+def save(results, filename=None):
+    if filename is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        filename = os.path.join(RESULTS_DIR, time.strftime('%Y%m%d-%H%M%S') + '.json')
+    data = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+    with open(filename, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    return filename
+
+
+def compare(results, baseline, threshold=0.1):
+    """
+    Compare results with baseline results, and return the names of the benchmarks that
+    are more than threshold (a fraction) slower
+    """
+    regressions = []
+    print('\n{:28} {:>10} {:>10} {:>8}'.format('benchmark', 'baseline', 'current', 'change'))
+    for name in sorted(results):
+        if name not in baseline:
+            print('{:28} {:>10} {:10.4f} {:>8}'.format(name, '-', results[name]['usec'], 'new'))
+            continue
+        old = baseline[name]['usec']
+        new = results[name]['usec']
+        change = new / old - 1
+        flag = ''
+        if change > threshold:
+            flag = '  SLOWER'
+            regressions.append(name)
+        elif change < -threshold:
+            flag = '  faster'
+        print('{:28} {:10.4f} {:10.4f} {:+7.1%}{}'.format(name, old, new, change, flag))
+    return regressions
+
+
+def _load_results(filename):
+    with open(filename) as f:
+        return json.load(f)['results']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the cookbook recipes')
+    parser.add_argument('-k', dest='patterns', action='append', default=[],
+                        help='only run benchmarks whose name contains this (repeatable)')
+    parser.add_argument('--list', action='store_true', help='list the benchmarks and exit')
+    parser.add_argument('--repeat', type=int, default=5, help='number of timing runs')
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help='minimum duration of a timing run in seconds')
+    parser.add_argument('--output', help='where to save the results')
+    parser.add_argument('--baseline', default=BASELINE, help='results to compare with')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='slowdown (as a fraction) that counts as a regression')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='make the results of this run the new baseline')
+    parser.add_argument('--compare', metavar='RESULTS',
+                        help='compare saved results with the baseline instead of running')
+    args = parser.parse_args(argv)
+
+    names = [name for name in BENCHMARKS
+             if not args.patterns or any(p in name for p in args.patterns)]
+    if args.list:
+        print('\n'.join(names))
+        return 0
+
+    if args.compare:
+        results = _load_results(args.compare)
+    else:
+        if not names:
+            parser.error('no benchmarks match {}'.format(args.patterns))
+        results = run(names, args.repeat, args.min_time)
+        filename = save(results, args.output)
+        print('\nResults saved to', os.path.relpath(filename))
+        if args.save_baseline:
+            os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+            shutil.copyfile(filename, args.baseline)
+            print('Saved as the baseline in', os.path.relpath(args.baseline))
+            return 0
+
+    if not os.path.exists(args.baseline):
+        print('No baseline to compare with, use --save-baseline to create one')
+        return 0
+    regressions = compare(results, _load_results(args.baseline), args.threshold)
+    if regressions:
+        print('\n{} benchmark(s) more than {:.0%} slower than the baseline: {}'.format(
+            len(regressions), args.threshold, ', '.join(regressions)))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
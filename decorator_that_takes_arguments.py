@@ -1,14 +1,22 @@
-from functools import wraps
+from functools import wraps, partial
 import logging
 
 
+def attach_wrapper(obj, func=None):
+    # Utility decorator to attach a function as an attribute of obj
+    if func is None:
+        return partial(attach_wrapper, obj)
+    setattr(obj, func.__name__, func)
+    return func
+
+
 def logged(level, name=None, message=None):
-'''
-Add logging to a function. level is the logging
-level, name is the logger name, and message is the
-log message. If name and message aren't specified,
-they default to the function's module and name.
-'''
+    '''
+    Add logging to a function. level is the logging
+    level, name is the logger name, and message is the
+    log message. If name and message aren't specified,
+    they default to the function's module and name.
+    '''
     def decorate(func):
         logname = name if name else func.__module__
         log = logging.getLogger(logname)
@@ -44,12 +52,6 @@ def spam():
     print('Spam!')
 
 
-def func(a, b):
-    pass
-    
-func = decorator(x, y, z)(func)
-
-
 """
 Here is an interactive session that shows the various attributes being changed after
 definition:
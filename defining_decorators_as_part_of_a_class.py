@@ -9,7 +9,7 @@ class A:
         def wrapper(*args, **kwargs):
             print('Decorator 1')
             return func(*args, **kwargs)
-    return wrapper
+        return wrapper
 
     # Decorator as a class method
     @classmethod
@@ -31,4 +31,181 @@ def spam():
 # As a class method
 @A.decorator2
 def grok():
-    pass
\ No newline at end of file
+    pass
+
+
+"""
+A decorator defined in a class can keep track of what it decorated. The following
+Instrumentation class registers every function it wraps on its owner (an instance for
+decorator(), the class itself for class_decorator()), so that all of them can be turned
+on and off together and call statistics are kept per owner.
+
+Checking a flag on every call still has a cost. So when instrumentation is switched
+off, the wrappers are taken out altogether. The raw functions are put back where the
+wrappers were bound: the module globals for functions, and the class found by following
+__qualname__ for methods. A function decorated while instrumentation is off is returned
+unwrapped in the first place.
+"""
+
+from time import perf_counter
+from types import MethodType
+
+
+class ownermethod:
+    """
+    Like a classmethod, but bound to the instance when called on one
+    """
+    def __init__(self, func):
+        self.__func__ = func
+
+    def __get__(self, instance, cls):
+        return MethodType(self.__func__, cls if instance is None else instance)
+
+
+def _binding(func):
+    # Return the namespace that func is bound in, or None if it can't be found
+    parts = func.__qualname__.split('.')
+    if '<locals>' in parts:
+        return None
+    namespace = func.__globals__
+    for part in parts[:-1]:
+        namespace = namespace.get(part) if isinstance(namespace, dict) else vars(namespace).get(part)
+        if not isinstance(namespace, type):
+            return None
+    return namespace
+
+
+def _rebind(func, old, new):
+    # Replace old by new wherever func was defined, if old is still bound there
+    namespace = _binding(func)
+    if isinstance(namespace, dict):
+        if namespace.get(func.__name__) is old:
+            namespace[func.__name__] = new
+    elif namespace is not None:
+        if vars(namespace).get(func.__name__) is old:
+            setattr(namespace, func.__name__, new)
+
+
+class Instrumentation:
+    enabled = True
+    _wrapped = []       # (func, wrapper) pairs registered on the class
+    stats = {}          # qualname -> [calls, total time]
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._wrapped = []
+        cls.stats = {}
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._wrapped = []
+        self.stats = {}
+
+    @staticmethod
+    def _wrap(owner, func):
+        stat = owner.stats.setdefault(func.__qualname__, [0, 0.0])
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not owner.enabled:
+                return func(*args, **kwargs)
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stat[0] += 1
+                stat[1] += perf_counter() - start
+        owner._wrapped.append((func, wrapper))
+        return wrapper if owner.enabled else func
+
+    # Decorator as an instance method
+    def decorator(self, func):
+        return self._wrap(self, func)
+
+    # Decorator as a class method
+    @classmethod
+    def class_decorator(cls, func):
+        return cls._wrap(cls, func)
+
+    @ownermethod
+    def enable(owner):
+        if not owner.enabled:
+            owner.enabled = True
+            for func, wrapper in owner._wrapped:
+                _rebind(func, func, wrapper)
+
+    @ownermethod
+    def disable(owner):
+        if owner.enabled:
+            owner.enabled = False
+            for func, wrapper in owner._wrapped:
+                _rebind(func, wrapper, func)
+
+    @ownermethod
+    def reset_stats(owner):
+        for stat in owner.stats.values():
+            stat[:] = [0, 0.0]
+
+    @ownermethod
+    def report(owner):
+        for name, (calls, total) in sorted(owner.stats.items(), key=lambda item: -item[1][1]):
+            print('{:30} {:8} calls {:10.3f} ms'.format(name, calls, total * 1000))
+
+"""
+Here is an example:
+>>> timing = Instrumentation()
+>>> @timing.decorator
+... def spam():
+...     pass
+...
+>>> class Spam:
+...     @Instrumentation.class_decorator
+...     def grok(self):
+...         pass
+...
+>>> spam(); spam(); Spam().grok()
+>>> timing.stats['spam'][0]
+2
+>>> Instrumentation.stats['Spam.grok'][0]
+1
+>>> timing.report()
+spam                                  2 calls ... ms
+>>> timing.disable()
+>>> hasattr(spam, '__wrapped__')
+False
+>>> timing.enable()
+>>> hasattr(spam, '__wrapped__')
+True
+>>>
+
+Only the name the function was originally bound to is replaced. Other references, such
+as the result of "from module import spam" or a wrapper captured by another decorator,
+keep calling the wrapper, which then just passes the call on. The same goes for
+functions defined inside other functions, since there is no namespace to rebind them in.
+Setting the enabled attribute directly also only switches the wrappers to pass-through,
+without rebinding anything.
+"""
+
+
+def _benchmark(number=1000000):
+    from timeit import timeit
+
+    timing = Instrumentation()
+
+    def raw():
+        pass
+
+    wrapped = timing.decorator(raw)
+
+    def run(label, func):
+        print('{:28} {:.3f} usec/call'.format(label, timeit(func, number=number) / number * 1e6))
+
+    run('raw function', raw)
+    run('enabled wrapper', wrapped)
+    timing.enabled = False
+    run('disabled wrapper', wrapped)
+    run('disabled and rebound', raw)
+
+
+if __name__ == '__main__':
+    _benchmark()
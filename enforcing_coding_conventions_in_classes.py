@@ -37,9 +37,17 @@ class A(Root):
         pass
 
 
-class B(Root):
-    def fooBar(self): # TypeError
-        pass
+"""
+Defining a class with a mixed-case method name now fails:
+>>> class B(Root):
+...     def fooBar(self):
+...         pass
+...
+Traceback (most recent call last):
+...
+TypeError: Bad attribute name: fooBar
+>>>
+"""
 
 
 """
@@ -50,25 +58,95 @@ method in the superclass.
 
 
 from inspect import signature
+from types import FunctionType
 import logging
+import threading
+
+
+# Signatures are cached by code object identity. (Code objects compare by content, so
+# identical method bodies in different classes would all land in the same hash bucket.)
+# The defaults and annotations are part of the signature but not of the code (functions
+# made by the same factory share one code object), so they are stored along with it and
+# compared on lookup.
+_signature_cache = {}
+
+
+def _signature(func):
+    # Only plain functions: bound methods share their function's code object, but
+    # not its signature. An explicit __signature__ overrides everything else.
+    if (type(func) is not FunctionType or hasattr(func, '__wrapped__') or
+            '__signature__' in func.__dict__):
+        return signature(func)
+    code = func.__code__
+    defaults = func.__defaults__
+    kwdefaults = func.__kwdefaults__
+    annotations = func.__annotations__
+    entry = _signature_cache.get(id(code))
+    if (entry is not None and entry[0] is code and entry[1] is defaults and
+            entry[2] is kwdefaults and entry[3] == annotations):
+        return entry[4]
+    sig = signature(func)
+    # Keeping a reference to the code object also keeps its id from being reused.
+    # The annotations are copied, since the dict can be changed in place.
+    _signature_cache[id(code)] = (code, defaults, kwdefaults, dict(annotations), sig)
+    return sig
 
 
 class MatchSignaturesMeta(type):
+    # Set to True to collect the checks and run them later with check_signatures()
+    deferred = False
+    _pending = []
+    _pending_lock = threading.Lock()
+
     def __init__(self, clsname, bases, clsdict):
         super().__init__(clsname, bases, clsdict)
+        # Checks are skipped entirely when running with python -O
+        if not __debug__:
+            return
+        names = [name for name, value in clsdict.items()
+                 if not name.startswith('_') and callable(value)]
+        if not names:
+            return
+        if MatchSignaturesMeta.deferred:
+            with MatchSignaturesMeta._pending_lock:
+                MatchSignaturesMeta._pending.append((self, names))
+        else:
+            self._check_signatures(names)
+
+    def _check_signatures(self, names):
         sup = super(self, self)
-        for name, value in clsdict.items():
-            if name.startswith('_') or not callable(value):
-                continue
+        for name in names:
+            value = self.__dict__[name]
             # Get the previous definition (if any) and compare the signatures
             prev_dfn = getattr(sup,name,None)
             if prev_dfn:
-                prev_sig = signature(prev_dfn)
-                val_sig = signature(value)
+                prev_sig = _signature(prev_dfn)
+                val_sig = _signature(value)
                 if prev_sig != val_sig:
                     logging.warning('Signature mismatch in %s. %s != %s',
                         value.__qualname__, prev_sig, val_sig)
 
+    @staticmethod
+    def check_signatures():
+        """
+        Run all of the checks collected in deferred mode
+        """
+        with MatchSignaturesMeta._pending_lock:
+            pending = MatchSignaturesMeta._pending[:]
+            del MatchSignaturesMeta._pending[:]
+        for cls, names in pending:
+            cls._check_signatures(names)
+
+    @staticmethod
+    def check_in_background(delay=0.0):
+        """
+        Run the collected checks in a daemon thread, after an optional delay
+        """
+        timer = threading.Timer(delay, MatchSignaturesMeta.check_signatures)
+        timer.daemon = True
+        timer.start()
+        return timer
+
 
 # Example
 class Root(metaclass=MatchSignaturesMeta):
@@ -90,3 +168,63 @@ class B(A):
 
     def spam(self,x,z):
         pass
+
+
+"""
+Calling inspect.signature() is relatively expensive, and the metaclass calls it twice
+for every public method that overrides another one, for every class in the hierarchy,
+all of it at import time. Three things keep this cost down. Signatures are cached by
+code object, so a base class method that is overridden in many subclasses is only
+inspected once. In deferred mode, class creation just records what needs to be checked,
+and the checks run later, either when check_signatures() is called or in a background
+thread after startup:
+
+    MatchSignaturesMeta.deferred = True
+    import myapp.models                      # Class creation only records the checks
+    MatchSignaturesMeta.check_in_background(delay=5)
+
+Finally, when Python runs with -O, __debug__ is False and no checks are done at all.
+"""
+
+
+def _benchmark(nclasses=3000, nmethods=10):
+    import time
+    import types
+
+    def method(self, x, y=1, *, z=None):
+        pass
+
+    def build(prefix):
+        names = ['method{}'.format(m) for m in range(nmethods)]
+        base = MatchSignaturesMeta(prefix, (), dict.fromkeys(names, method))
+        for i in range(nclasses):
+            # Every override gets its own code object, as it would in real code
+            overrides = {name: types.FunctionType(method.__code__.replace(co_firstlineno=i + 1),
+                                                  globals(), name, method.__defaults__)
+                         for name in names}
+            for func in overrides.values():
+                func.__kwdefaults__ = method.__kwdefaults__
+            MatchSignaturesMeta('{}{}'.format(prefix, i), (base,), overrides)
+
+    def measure(label, deferred=False):
+        MatchSignaturesMeta.deferred = deferred
+        start = time.perf_counter()
+        build(label)
+        elapsed = time.perf_counter() - start
+        MatchSignaturesMeta.deferred = False
+        print('{:28} {:.3f} sec for {} classes'.format(label, elapsed, nclasses))
+
+    # Without the cache, as in the original version
+    cached_signature = globals()['_signature']
+    globals()['_signature'] = signature
+    measure('uncached')
+    globals()['_signature'] = cached_signature
+    measure('cached')
+    measure('deferred (import only)', deferred=True)
+    start = time.perf_counter()
+    MatchSignaturesMeta.check_signatures()
+    print('{:28} {:.3f} sec'.format('deferred checks, run later', time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    _benchmark()
@@ -1,4 +1,4 @@
-from collections import Iterable
+from collections.abc import Iterable
 
 """
 Problem
@@ -13,13 +13,13 @@ def flatten(items, ignore_types=(str, bytes)):
         if isinstance(x, Iterable) and not isinstance(x, ignore_types):
             yield from flatten(x)
         else:
-    yield x
+            yield x
 
 
 items = [1, 2, [3, 4, [5, 6], 7], 8]
 # Produces 1 2 3 4 5 6 7 8
 for x in flatten(items):
-print(x)
+    print(x)
 
 """
 The yield from statement is a nice shortcut to use if you ever want to write generators
@@ -34,3 +34,97 @@ def flatten(items, ignore_types=(str, bytes)):
                 yield i
         else:
             yield x
+
+
+"""
+Both versions pay for every level of nesting: each value is passed up through one
+generator frame per level, and very deep inputs fail with RecursionError. The
+isinstance() check against the Iterable abstract base class is also comparatively slow
+to run on every single value.
+
+The following version keeps its own stack of iterators instead of recursing. The
+decision of whether a value should be descended into is made once per type and cached,
+with list and tuple known up front (unless they are among the ignored types):
+"""
+
+from itertools import islice
+
+
+def iflatten(items, ignore_types=(str, bytes), max_depth=None):
+    # Maps exact type -> should values of this type be flattened?
+    nested = {cls: True for cls in (list, tuple) if not issubclass(cls, ignore_types)}
+    stack = [iter(items)]
+    push = stack.append
+    limit = float('inf') if max_depth is None else max_depth
+    while stack:
+        for x in stack[-1]:
+            cls = type(x)
+            descend = nested.get(cls)
+            if descend is None:
+                descend = nested[cls] = (issubclass(cls, Iterable) and
+                                         not issubclass(cls, ignore_types))
+            # A one-character string iterates to itself, so it is never descended into
+            if descend and len(stack) <= limit and not (isinstance(x, str) and len(x) == 1):
+                push(iter(x))
+                break
+            yield x
+        else:
+            stack.pop()
+
+
+def flatten_chunks(items, size, ignore_types=(str, bytes), max_depth=None):
+    # Yield the flattened values as lists of (at most) size items
+    values = iflatten(items, ignore_types, max_depth)
+    while True:
+        chunk = list(islice(values, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+"""
+For example:
+>>> list(iflatten([1, [2, [3, [4]]], 'abc']))
+[1, 2, 3, 4, 'abc']
+>>> list(iflatten([1, [2, [3, [4]]]], max_depth=1))
+[1, 2, [3, [4]]]
+>>> list(flatten_chunks(range(7), 3))
+[[0, 1, 2], [3, 4, 5], [6]]
+>>> deep = []
+>>> for _ in range(100000):
+...     deep = [deep]
+...
+>>> list(iflatten(deep))
+[]
+>>>
+
+The type cache is local to each call, so a type whose instances become iterable later
+on is picked up by the next call.
+"""
+
+
+def _benchmark():
+    from timeit import timeit
+
+    wide = [[list(range(100)) for _ in range(100)] for _ in range(10)]
+    deep = 1
+    for _ in range(500):
+        deep = [deep, 1]
+    for name, data in (('wide', wide), ('deep', deep)):
+        for func in (flatten, iflatten):
+            elapsed = timeit(lambda: sum(1 for _ in func(data)), number=10) / 10
+            print('{:5} {:9} {:.2f} msec'.format(name, func.__name__, elapsed * 1e3))
+
+    very_deep = []
+    for _ in range(100000):
+        very_deep = [very_deep]
+    try:
+        list(flatten(very_deep))
+    except RecursionError:
+        print('flatten: RecursionError at depth 100000')
+    print('iflatten at depth 100000: {:.2f} msec'.format(
+        timeit(lambda: list(iflatten(very_deep)), number=1) * 1e3))
+
+
+if __name__ == '__main__':
+    _benchmark()
@@ -2,4 +2,158 @@ def frange(start, stop, increment):
     x = start
     while x < stop:
         yield x
-        x += increment
\ No newline at end of file
+        x += increment
+
+
+"""
+Adding the increment over and over lets rounding errors accumulate. With an increment
+of 0.1, the tenth addition gives 0.9999999999999999 instead of 1.0, so frange(0, 1, 0.1)
+produces 11 values instead of 10:
+>>> len(list(frange(0, 1, 0.1)))
+11
+>>>
+
+The following class computes each element directly as start + i*step, so every value
+is exact to within a single rounding. Like range(), it works out its length up front and
+supports indexing, slicing and reversal without producing any values. Internally it
+simply pairs the start and step with a range of integer indices:
+"""
+
+
+import collections.abc
+import math
+from itertools import repeat
+
+
+class FloatRange(collections.abc.Sequence):
+    def __init__(self, start, stop=None, step=1.0):
+        if stop is None:
+            start, stop = 0.0, start
+        if step == 0:
+            raise ValueError('FloatRange() arg 3 must not be zero')
+        n = max(0, math.ceil((stop - start) / step))
+        # The division may be off by one for values right at the boundary
+        if step > 0:
+            while n and start + (n - 1) * step >= stop:
+                n -= 1
+            while start + n * step < stop:
+                n += 1
+        else:
+            while n and start + (n - 1) * step <= stop:
+                n -= 1
+            while start + n * step > stop:
+                n += 1
+        self.start = start
+        self.stop = stop
+        self.step = step
+        self._indices = range(n)
+
+    @classmethod
+    def _from_indices(cls, start, stop, step, indices):
+        self = cls.__new__(cls)
+        self.start = start
+        self.stop = stop
+        self.step = step
+        self._indices = indices
+        return self
+
+    def __len__(self):
+        return len(self._indices)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._from_indices(self.start, self.stop, self.step,
+                                      self._indices[index])
+        return self.start + self._indices[index] * self.step
+
+    def __iter__(self):
+        # Same values as (start + i * step for i in indices), but the index is kept as
+        # a float, so that the loop only does float arithmetic (which the interpreter
+        # handles much faster than mixed int * float)
+        start = self.start
+        step = self.step
+        indices = self._indices
+        i = float(indices.start)
+        di = float(indices.step)
+        for _ in repeat(None, len(indices)):
+            yield start + i * step
+            i += di
+
+    def __reversed__(self):
+        return iter(self[::-1])
+
+    def __contains__(self, value):
+        try:
+            i = round((value - self.start) / self.step)
+        except (TypeError, ValueError, OverflowError):
+            # Not a number, or NaN or infinity
+            return False
+        return i in self._indices and self.start + i * self.step == value
+
+    def __repr__(self):
+        r = self._indices
+        if r.step == 1 and r.start == 0:
+            return 'FloatRange({!r}, {!r}, {!r})'.format(self.start, self.stop, self.step)
+        return 'FloatRange({!r}, {!r}, {!r})[{}:{}:{}]'.format(
+            self.start, self.stop, self.step, r.start, r.stop, r.step)
+
+    def to_numpy(self, dtype=float):
+        import numpy as np
+        r = self._indices
+        return self.start + np.arange(r.start, r.stop, r.step, dtype=dtype) * self.step
+
+    def chunks(self, size):
+        # Split into consecutive sub-ranges of (at most) size elements
+        for i in range(0, len(self), size):
+            yield self[i:i + size]
+
+
+"""
+For example:
+>>> r = FloatRange(0, 1, 0.1)
+>>> len(r)
+10
+>>> r[3]
+0.30000000000000004
+>>> r[-1]
+0.9
+>>> list(r[::4])
+[0.0, 0.4, 0.8]
+>>> list(reversed(r[:3]))
+[0.2, 0.1, 0.0]
+>>> [len(chunk) for chunk in r.chunks(4)]
+[4, 4, 2]
+>>>
+
+Iterating over a FloatRange costs a little more per value than frange(), since each
+value takes a multiplication and an addition instead of a single addition; what it gains
+is accuracy, not speed. Bulk consumers can take chunks and call to_numpy() on each of them, which computes all
+of the values of a chunk in a single vectorized operation (NumPy is only imported when
+to_numpy() is used).
+"""
+
+
+def _benchmark(n=10000000):
+    import time
+    from collections import deque
+
+    step = 1 / n
+    start = time.perf_counter()
+    deque(frange(0, 1, step), maxlen=0)
+    print('frange:           {:.2f} sec'.format(time.perf_counter() - start))
+    r = FloatRange(0, 1, step)
+    start = time.perf_counter()
+    deque(r, maxlen=0)
+    print('FloatRange iter:  {:.2f} sec'.format(time.perf_counter() - start))
+    try:
+        import numpy
+    except ImportError:
+        return
+    start = time.perf_counter()
+    for chunk in r.chunks(1000000):
+        chunk.to_numpy()
+    print('FloatRange numpy: {:.2f} sec'.format(time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    _benchmark()
@@ -4,13 +4,13 @@ sequence where items are always stored in sorted order (it’s not a particularl
 implementation, but it illustrates the general idea):
 """
 
-import collections
+import collections.abc
 import bisect
 
 
-class SortedItems(collections.Sequence):
+class SortedItems(collections.abc.Sequence):
     def __init__(self, initial=None):
-        self._items = sorted(initial) if initial is None else []
+        self._items = sorted(initial) if initial is not None else []
 
     # Required sequence methods
     def __getitem__(self, index):
@@ -21,4 +21,480 @@ class SortedItems(collections.Sequence):
 
     # Method for adding an item in the right location
     def add(self, item):
-        bisect.insort(self._items, item)
\ No newline at end of file
+        bisect.insort(self._items, item)
+
+
+"""
+The problem with SortedItems is that bisect.insort() has to shift every item after the
+insertion point, so each add() is O(n). For a few thousand items nobody notices, but with
+a million items the inserts dominate everything else.
+
+A common fix is to keep the items in a list of smaller sorted sublists, each holding
+roughly `load` items. An insert only shifts items inside one sublist, and a sublist that
+grows past twice the load is split in two. To find the sublist that holds a given
+position, the lengths of the sublists are kept in a Fenwick (binary indexed) tree that
+is rebuilt lazily whenever sublists are split or merged.
+
+Items can be ordered by a key function, in which case the keys are stored in a second
+set of sublists that mirrors the first one. Range queries return lazy views, so nothing
+is copied until the results are actually consumed:
+"""
+
+
+from itertools import chain, islice
+
+
+class SortedList(collections.abc.Sequence):
+    def __init__(self, iterable=None, key=None, load=1000):
+        self._key = key
+        self._load = load
+        self._len = 0
+        self._lists = []
+        # Without a key function, the items are their own keys
+        self._keys = [] if key is not None else self._lists
+        self._maxes = []
+        # Fenwick tree over the sublist lengths; None means it has to be rebuilt
+        self._index = None
+        if iterable is not None:
+            self.update(iterable)
+
+    @property
+    def key(self):
+        return self._key
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        return chain.from_iterable(self._lists)
+
+    def __reversed__(self):
+        return chain.from_iterable(map(reversed, reversed(self._lists)))
+
+    def __contains__(self, value):
+        return self._find(value) is not None
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._len)
+            if step == 1:
+                return list(self.islice(start, stop))
+            return [self[i] for i in range(start, stop, step)]
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError('SortedList index out of range')
+        pos, offset = self._locate(index)
+        return self._lists[pos][offset]
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            for i in sorted(range(*index.indices(self._len)), reverse=True):
+                del self[i]
+            return
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError('SortedList assignment index out of range')
+        self._delete(*self._locate(index))
+
+    def __repr__(self):
+        if self._key is None:
+            return '{}({!r})'.format(type(self).__name__, list(self))
+        return '{}({!r}, key={!r})'.format(type(self).__name__, list(self), self._key)
+
+    def add(self, value):
+        key = self._key
+        k = value if key is None else key(value)
+        maxes = self._maxes
+        if not maxes:
+            self._lists.append([value])
+            if key is not None:
+                self._keys.append([k])
+            maxes.append(k)
+            self._len = 1
+            self._index = None
+            return
+        pos = bisect.bisect_right(maxes, k)
+        if pos == len(maxes):
+            pos -= 1
+            self._lists[pos].append(value)
+            if key is not None:
+                self._keys[pos].append(k)
+            maxes[pos] = k
+        elif key is None:
+            bisect.insort(self._lists[pos], value)
+        else:
+            keys = self._keys[pos]
+            i = bisect.bisect_right(keys, k)
+            keys.insert(i, k)
+            self._lists[pos].insert(i, value)
+        self._len += 1
+        self._expand(pos)
+
+    def update(self, iterable):
+        # Sort the new values once and merge them with the existing ones; sorted()
+        # detects the two sorted runs, so this is a single merge pass
+        key = self._key
+        values = sorted(iterable, key=key)
+        if not values:
+            return
+        if self._len:
+            values = sorted(chain(self, values), key=key)
+        load = self._load
+        self._lists = [values[i:i + load] for i in range(0, len(values), load)]
+        if key is None:
+            self._keys = self._lists
+        else:
+            keys = list(map(key, values))
+            self._keys = [keys[i:i + load] for i in range(0, len(keys), load)]
+        self._maxes = [sub[-1] for sub in self._keys]
+        self._len = len(values)
+        self._index = None
+
+    def remove(self, value):
+        found = self._find(value)
+        if found is None:
+            raise ValueError('{!r} not in list'.format(value))
+        self._delete(*found)
+
+    def discard(self, value):
+        found = self._find(value)
+        if found is not None:
+            self._delete(*found)
+
+    def pop(self, index=-1):
+        value = self[index]
+        del self[index]
+        return value
+
+    def bisect_key_left(self, k):
+        pos = bisect.bisect_left(self._maxes, k)
+        if pos == len(self._maxes):
+            return self._len
+        return self._offset(pos) + bisect.bisect_left(self._keys[pos], k)
+
+    def bisect_key_right(self, k):
+        pos = bisect.bisect_right(self._maxes, k)
+        if pos == len(self._maxes):
+            return self._len
+        return self._offset(pos) + bisect.bisect_right(self._keys[pos], k)
+
+    def bisect_left(self, value):
+        return self.bisect_key_left(value if self._key is None else self._key(value))
+
+    def bisect_right(self, value):
+        return self.bisect_key_right(value if self._key is None else self._key(value))
+
+    bisect = bisect_right
+
+    def rank(self, value):
+        """
+        Number of items that sort strictly before value
+        """
+        return self.bisect_left(value)
+
+    def index(self, value, start=0, stop=None):
+        found = self._find(value)
+        if found is not None:
+            i = self._offset(found[0]) + found[1]
+            if stop is None:
+                stop = self._len
+            if start <= i < stop:
+                return i
+        raise ValueError('{!r} not in list'.format(value))
+
+    def count(self, value):
+        if self._key is None:
+            return self.bisect_right(value) - self.bisect_left(value)
+        return sum(1 for item in self.irange(value, value) if item == value)
+
+    def islice(self, start=None, stop=None, reverse=False):
+        """
+        Iterate over the items between positions start and stop without building a list
+        """
+        start, stop, _ = slice(start, stop).indices(self._len)
+        if start >= stop:
+            return iter(())
+        lists = self._lists
+        if reverse:
+            pos, offset = self._locate(stop - 1)
+            first = reversed(lists[pos][:offset + 1])
+            rest = map(reversed, map(lists.__getitem__, range(pos - 1, -1, -1)))
+        else:
+            pos, offset = self._locate(start)
+            first = islice(lists[pos], offset, None)
+            rest = map(lists.__getitem__, range(pos + 1, len(lists)))
+        return islice(chain(first, chain.from_iterable(rest)), stop - start)
+
+    def irange(self, lo=None, hi=None, inclusive=(True, True), reverse=False):
+        """
+        Lazy view of the items between the values lo and hi (None means unbounded)
+        """
+        key = self._key
+        if key is not None:
+            lo = None if lo is None else key(lo)
+            hi = None if hi is None else key(hi)
+        return SortedRange(self, lo, hi, inclusive, reverse)
+
+    def irange_key(self, lo=None, hi=None, inclusive=(True, True), reverse=False):
+        """
+        Like irange(), but lo and hi are given as keys rather than values
+        """
+        return SortedRange(self, lo, hi, inclusive, reverse)
+
+    # Internal helpers for the sublists and the positional index
+
+    def _find(self, value):
+        # Return (sublist, offset) of an item equal to value, or None
+        key = self._key
+        k = value if key is None else key(value)
+        maxes = self._maxes
+        pos = bisect.bisect_left(maxes, k)
+        if pos == len(maxes):
+            return None
+        keys = self._keys[pos]
+        i = bisect.bisect_left(keys, k)
+        if key is None:
+            return (pos, i) if keys[i] == value else None
+        # Several items can share a key, possibly spanning sublists
+        while keys[i] == k:
+            if self._lists[pos][i] == value:
+                return pos, i
+            i += 1
+            if i == len(keys):
+                pos += 1
+                if pos == len(maxes):
+                    return None
+                keys = self._keys[pos]
+                i = 0
+        return None
+
+    def _expand(self, pos):
+        sub = self._lists[pos]
+        load = self._load
+        if len(sub) > 2 * load:
+            half = sub[load:]
+            del sub[load:]
+            self._lists.insert(pos + 1, half)
+            if self._key is not None:
+                keys = self._keys[pos]
+                self._keys.insert(pos + 1, keys[load:])
+                del keys[load:]
+            self._maxes[pos] = self._keys[pos][-1]
+            self._maxes.insert(pos + 1, self._keys[pos + 1][-1])
+            self._index = None
+        elif self._index is not None:
+            self._index_add(pos, 1)
+
+    def _delete(self, pos, i):
+        lists = self._lists
+        keyed = self._key is not None
+        sub = lists[pos]
+        del sub[i]
+        if keyed:
+            del self._keys[pos][i]
+        self._len -= 1
+        if not sub:
+            del lists[pos]
+            if keyed:
+                del self._keys[pos]
+            del self._maxes[pos]
+            self._index = None
+        elif len(sub) < self._load // 2 and len(lists) > 1:
+            # Merge a small sublist into a neighbour, splitting again if needed
+            if pos == 0:
+                pos += 1
+            lists[pos - 1].extend(lists[pos])
+            del lists[pos]
+            if keyed:
+                self._keys[pos - 1].extend(self._keys[pos])
+                del self._keys[pos]
+            del self._maxes[pos]
+            self._maxes[pos - 1] = self._keys[pos - 1][-1]
+            self._index = None
+            self._expand(pos - 1)
+        else:
+            if i == len(sub):
+                self._maxes[pos] = self._keys[pos][-1]
+            if self._index is not None:
+                self._index_add(pos, -1)
+
+    def _build_index(self):
+        tree = [0]
+        tree.extend(map(len, self._lists))
+        size = len(tree)
+        for i in range(1, size):
+            j = i + (i & -i)
+            if j < size:
+                tree[j] += tree[i]
+        self._index = tree
+        return tree
+
+    def _index_add(self, pos, delta):
+        tree = self._index
+        size = len(tree)
+        i = pos + 1
+        while i < size:
+            tree[i] += delta
+            i += i & -i
+
+    def _offset(self, pos):
+        # Number of items stored in the sublists before sublist pos
+        tree = self._index or self._build_index()
+        total = 0
+        while pos:
+            total += tree[pos]
+            pos -= pos & -pos
+        return total
+
+    def _locate(self, index):
+        # Map a position to (sublist, offset within the sublist)
+        lists = self._lists
+        if index < len(lists[0]):
+            return 0, index
+        tree = self._index or self._build_index()
+        size = len(tree)
+        pos = 0
+        bit = 1 << (size - 1).bit_length()
+        while bit:
+            nxt = pos + bit
+            if nxt < size and tree[nxt] <= index:
+                pos = nxt
+                index -= tree[nxt]
+            bit >>= 1
+        return pos, index
+
+
+class SortedRange(collections.abc.Sequence):
+    """
+    A live view of the items of a SortedList whose keys fall between two bounds.
+    The positions are looked up again on every use, so the view follows later changes
+    to the list, and iterating it streams items straight out of the sublists.
+    """
+    def __init__(self, items, lo, hi, inclusive=(True, True), reverse=False):
+        self._items = items
+        self._lo = lo
+        self._hi = hi
+        self._inclusive = inclusive
+        self._reverse = reverse
+
+    def _bounds(self):
+        items = self._items
+        lo_inclusive, hi_inclusive = self._inclusive
+        if self._lo is None:
+            start = 0
+        elif lo_inclusive:
+            start = items.bisect_key_left(self._lo)
+        else:
+            start = items.bisect_key_right(self._lo)
+        if self._hi is None:
+            stop = len(items)
+        elif hi_inclusive:
+            stop = items.bisect_key_right(self._hi)
+        else:
+            stop = items.bisect_key_left(self._hi)
+        return start, max(start, stop)
+
+    def __len__(self):
+        start, stop = self._bounds()
+        return stop - start
+
+    def __iter__(self):
+        start, stop = self._bounds()
+        return self._items.islice(start, stop, reverse=self._reverse)
+
+    def __reversed__(self):
+        start, stop = self._bounds()
+        return self._items.islice(start, stop, reverse=not self._reverse)
+
+    def __getitem__(self, index):
+        start, stop = self._bounds()
+        if isinstance(index, slice):
+            return [self._items[start + i] if not self._reverse else self._items[stop - 1 - i]
+                    for i in range(*index.indices(stop - start))]
+        if index < 0:
+            index += stop - start
+        if not 0 <= index < stop - start:
+            raise IndexError('SortedRange index out of range')
+        if self._reverse:
+            return self._items[stop - 1 - index]
+        return self._items[start + index]
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, list(self))
+
+
+"""
+SortedList behaves like SortedItems, but also supports removal and searching:
+>>> s = SortedList([5, 1, 4])
+>>> s.add(3)
+>>> s.add(2)
+>>> s
+SortedList([1, 2, 3, 4, 5])
+>>> s[1], s[-1], s[1:3]
+(2, 5, [2, 3])
+>>> s.remove(4)
+>>> s.bisect_left(3), s.bisect_right(3)
+(2, 3)
+>>> list(s.islice(1, 3))
+[2, 3]
+>>>
+
+Order statistics and range queries come for free from the positional index. rank()
+counts the items smaller than a value, indexing gives the k-th smallest item, and
+irange() returns a view of the items between two values:
+>>> scores = SortedList([('ann', 70), ('bob', 95), ('cid', 80), ('dee', 95)],
+...                     key=lambda entry: -entry[1])
+>>> scores[0]
+('bob', 95)
+>>> scores.rank(('cid', 80))
+2
+>>> top = scores.irange_key(-100, -80)
+>>> len(top)
+3
+>>> list(top)
+[('bob', 95), ('dee', 95), ('cid', 80)]
+>>> scores.add(('eve', 85))
+>>> list(top)
+[('bob', 95), ('dee', 95), ('eve', 85), ('cid', 80)]
+>>>
+
+An add() costs a bisect over the sublist maxima plus an insort into a list of at most
+2 * load items. The positional index is only needed by indexing, the bisect methods and
+views, so a run of inserts never pays for keeping it up to date once splits start
+throwing it away. Queries cost a couple of bisects plus a walk down the Fenwick tree,
+followed by the number of items actually consumed.
+"""
+
+
+def _benchmark(n=200000):
+    import random
+    import time
+
+    values = [random.random() for _ in range(n)]
+    for cls in (SortedItems, SortedList):
+        s = cls()
+        start = time.perf_counter()
+        for v in values:
+            s.add(v)
+        elapsed = time.perf_counter() - start
+        print('{:12} {} adds: {:.3f} sec ({:.2f} usec/add)'.format(
+            cls.__name__, n, elapsed, elapsed / n * 1e6))
+    start = time.perf_counter()
+    s = SortedList()
+    s.update(values)
+    print('SortedList   bulk update of {}: {:.3f} sec'.format(n, time.perf_counter() - start))
+
+    probes = values[:1000]
+    start = time.perf_counter()
+    for v in probes:
+        s.rank(v)
+        list(islice(s.irange(v), 10))
+    elapsed = time.perf_counter() - start
+    print('SortedList   rank + 10-item irange: {:.2f} usec/query'.format(
+        elapsed / len(probes) * 1e6))
+
+
+if __name__ == '__main__':
+    _benchmark()
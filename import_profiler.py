@@ -0,0 +1,295 @@
+"""
+Find out what importing each recipe costs.
+
+Every module is imported in a fresh interpreter, so that the numbers of one module
+aren't hidden by imports that an earlier module already paid for. For each module the
+report shows:
+
+    time      wall time of the import (measured without tracemalloc running)
+    memory    memory still allocated after the import, according to tracemalloc
+    peak      peak memory allocated during the import
+    objects   growth in the number of objects tracked by the garbage collector
+    modules   number of other modules imported along the way
+
+Module-level side effects are flagged as well: opening files, connecting sockets
+(connections are blocked and fail with OSError), writing to stdout/stderr, starting
+threads and running subprocesses or shell commands.
+
+    python import_profiler.py                    # every module in this directory
+    python import_profiler.py skipping_items.py  # only these
+    python import_profiler.py --sort memory --json imports.json
+"""
+
+import argparse
+import builtins
+import gc
+import glob
+import importlib.util
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RESULT_MARKER = '@@import_profiler@@'
+
+
+class _Recorder:
+    """
+    Patches the functions that cause side effects and records calls to them
+    """
+    def __init__(self, filename):
+        self.filename = os.path.abspath(filename)
+        self.events = []
+        self.output = {'stdout': 0, 'stderr': 0}
+        self._undo = []
+
+    def where(self):
+        # Innermost line of the module itself that led to the call, if there is one
+        frame = sys._getframe(2)
+        caller = frame
+        while frame is not None:
+            if frame.f_code.co_filename == self.filename:
+                return 'line {}'.format(frame.f_lineno)
+            frame = frame.f_back
+        return '{}:{}'.format(os.path.basename(caller.f_code.co_filename), caller.f_lineno)
+
+    def record(self, kind, detail, blocked=False):
+        self.events.append({'kind': kind, 'detail': detail, 'where': self.where(),
+                            'blocked': blocked})
+
+    def patch(self, obj, name, make):
+        original = getattr(obj, name)
+        setattr(obj, name, make(original))
+        self._undo.append((obj, name, original))
+
+    def install(self):
+        import os
+        import socket
+        import subprocess
+        import threading
+        record = self.record
+
+        def make_open(original):
+            def open(file, mode='r', *args, **kwargs):
+                record('open', '{} ({})'.format(file, mode))
+                return original(file, mode, *args, **kwargs)
+            return open
+
+        def make_connect(original):
+            def connect(sock, address):
+                record('connect', repr(address), blocked=True)
+                raise OSError('network access blocked while profiling imports')
+            return connect
+
+        def make_start(original):
+            def start(thread):
+                record('thread', thread.name)
+                return original(thread)
+            return start
+
+        def make_popen(original):
+            def __init__(popen, args, *rest, **kwargs):
+                record('subprocess', repr(args))
+                return original(popen, args, *rest, **kwargs)
+            return __init__
+
+        def make_system(original):
+            def system(command):
+                record('subprocess', repr(command))
+                return original(command)
+            return system
+
+        self.patch(builtins, 'open', make_open)
+        self.patch(socket.socket, 'connect', make_connect)
+        self.patch(socket.socket, 'connect_ex', make_connect)
+        self.patch(threading.Thread, 'start', make_start)
+        self.patch(subprocess.Popen, '__init__', make_popen)
+        self.patch(os, 'system', make_system)
+        self._streams = sys.stdout, sys.stderr
+        sys.stdout = _CountingStream(self, 'stdout')
+        sys.stderr = _CountingStream(self, 'stderr')
+
+    def uninstall(self):
+        sys.stdout, sys.stderr = self._streams
+        for obj, name, original in reversed(self._undo):
+            setattr(obj, name, original)
+        self._undo.clear()
+
+
+class _CountingStream:
+    # Stands in for stdout/stderr, counting (and swallowing) what is written
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+
+    def write(self, text):
+        self.recorder.output[self.name] += len(text)
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+
+def _import(filename, memory):
+    # Runs in the child process: import filename and return the measurements
+    import tracemalloc
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(filename)))
+    name = re.sub(r'\W', '_', os.path.splitext(os.path.basename(filename))[0])
+    spec = importlib.util.spec_from_file_location(name, filename)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+
+    recorder = _Recorder(filename)
+    recorder.install()
+    before = set(sys.modules)
+    gc.collect()
+    objects = len(gc.get_objects())
+    if memory:
+        tracemalloc.start()
+    error = None
+    start = time.perf_counter()
+    try:
+        spec.loader.exec_module(module)
+    except BaseException as e:
+        error = '{}: {}'.format(type(e).__name__, e)
+    elapsed = time.perf_counter() - start
+    if memory:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    recorder.uninstall()
+
+    result = {
+        'time': elapsed,
+        'modules': len(set(sys.modules) - before),
+        'events': recorder.events,
+        'output': recorder.output,
+        'error': error,
+    }
+    if memory:
+        gc.collect()
+        result.update(memory=current, peak=peak, objects=len(gc.get_objects()) - objects)
+    return result
+
+
+def _child(filename, memory):
+    result = _import(filename, memory)
+    sys.stdout.write('\n{}{}\n'.format(RESULT_MARKER, json.dumps(result)))
+    sys.stdout.flush()
+    # Skip interpreter cleanup, which may run atexit handlers left behind by the module
+    os._exit(0)
+
+
+def _run_child(filename, memory, timeout):
+    command = [sys.executable, os.path.abspath(__file__), '--child', filename]
+    if memory:
+        command.append('--memory')
+    try:
+        proc = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                              stdin=subprocess.DEVNULL, timeout=timeout,
+                              universal_newlines=True)
+    except subprocess.TimeoutExpired:
+        return {'error': 'timed out after {}s'.format(timeout)}
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER):])
+    lines = proc.stderr.strip().splitlines()
+    return {'error': lines[-1] if lines else 'exited with status {}'.format(proc.returncode)}
+
+
+def profile(filename, timeout=60):
+    """
+    Import filename in two fresh interpreters, one for the timing and one with
+    tracemalloc running, and combine the results
+    """
+    timing = _run_child(filename, False, timeout)
+    result = {'module': os.path.relpath(filename), 'time': None, 'memory': None,
+              'peak': None, 'objects': None, 'modules': None, 'events': [],
+              'output': {}, 'error': None}
+    result.update(timing)
+    if 'time' in timing:
+        memory = _run_child(filename, True, timeout)
+        for key in ('memory', 'peak', 'objects'):
+            result[key] = memory.get(key)
+    return result
+
+
+def _side_effects(result):
+    effects = []
+    counts = {}
+    for event in result['events']:
+        counts.setdefault(event['kind'], []).append(event)
+    for kind, events in counts.items():
+        first = events[0]
+        text = '{}{} {} ({})'.format(kind, ' blocked' if first['blocked'] else '',
+                                     first['detail'], first['where'])
+        if len(events) > 1:
+            text += ' +{} more'.format(len(events) - 1)
+        effects.append(text)
+    for stream, count in sorted(result['output'].items()):
+        if count:
+            effects.append('{} {} chars'.format(stream, count))
+    if result['error']:
+        effects.append('error ' + result['error'])
+    return effects
+
+
+def _number(value, scale=1, fmt='{:10.1f}'):
+    return '{:>10}'.format('-') if value is None else fmt.format(value * scale)
+
+
+def report(results, sort='time', file=None):
+    results = sorted(results, key=lambda r: -(r[sort] or 0))
+    width = max([len(r['module']) for r in results] + [6])
+    print('{:{}} {:>10} {:>10} {:>10} {:>10} {:>10}'.format(
+          'module', width, 'time ms', 'memory KiB', 'peak KiB', 'objects', 'modules'), file=file)
+    for r in results:
+        print('{:{}} {} {} {} {} {}'.format(
+              r['module'], width,
+              _number(r['time'], 1000, '{:10.2f}'),
+              _number(r['memory'], 1 / 1024),
+              _number(r['peak'], 1 / 1024),
+              _number(r['objects'], fmt='{:10d}'),
+              _number(r['modules'], fmt='{:10d}')), file=file)
+        for effect in _side_effects(r):
+            print('{:{}}   ! {}'.format('', width, effect), file=file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Profile the import of each module')
+    parser.add_argument('files', nargs='*', help='modules to profile (default: all)')
+    parser.add_argument('--sort', choices=['time', 'memory', 'peak', 'objects', 'modules'],
+                        default='time', help='column to sort the report by')
+    parser.add_argument('--json', metavar='FILE', help='also save the results as JSON')
+    parser.add_argument('--timeout', type=float, default=60,
+                        help='seconds to wait for a single import')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--memory', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        _child(args.child, args.memory)
+
+    files = args.files or sorted(
+        f for f in glob.glob(os.path.join(HERE, '*.py'))
+        if os.path.abspath(f) != os.path.abspath(__file__))
+    results = []
+    for filename in files:
+        print('Importing', os.path.relpath(filename), file=sys.stderr, flush=True)
+        results.append(profile(filename, args.timeout))
+    print(file=sys.stderr)
+    report(results, args.sort)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -48,4 +48,363 @@ Computing perimeter
 >>> c.perimeter
 25.132741228718345
 >>>
-"""
\ No newline at end of file
+"""
+
+"""
+The lazyproperty above relies on the instance dictionary: once the value has been
+computed, setattr() puts it into __dict__ and the descriptor is never consulted again.
+Classes that define __slots__ have no __dict__, so that trick is not available. Also, if
+two threads read the property at the same time, both of them may run the function.
+
+Here is a variant that stores the computed value in a dedicated slot (by default the
+property name with a leading underscore). The property name itself is made an alias of
+that slot, so once the value is there, reading it is a plain slot access, handled
+entirely in C. While the slot is empty, the read fails and Python falls back to
+__getattr__(), which computes the value. A lock for each instance and property makes
+sure the function runs exactly once, even under concurrency:
+"""
+
+
+import threading
+import weakref
+
+# (id(instance), name) -> [lock, number of threads using it], only while computing
+_computing = {}
+_computing_lock = threading.Lock()
+
+
+class slotted_lazyproperty:
+    def __init__(self, func, slot=None):
+        self.func = func
+        self.slot = slot
+        self.name = None
+        self._member = None
+
+    def __set_name__(self, owner, name):
+        if self.slot is None:
+            self.slot = '_' + name
+        self.name = name
+        self._member = getattr(owner, self.slot, None)
+        if not hasattr(self._member, '__delete__'):
+            raise TypeError('{}.{} requires a slot named {!r}'.format(
+                owner.__name__, name, self.slot))
+        # Replace the property by the slot, and register it for _lazy_getattr()
+        setattr(owner, name, self._member)
+        registry = owner.__dict__.get('_lazy_properties')
+        if registry is None:
+            registry = dict(getattr(owner, '_lazy_properties', {}))
+            owner._lazy_properties = registry
+            fallback = owner.__dict__.get('__getattr__')
+            owner.__getattr__ = _make_lazy_getattr(fallback)
+        registry[name] = self
+
+    def compute(self, instance):
+        # Each instance and property gets its own lock while the value is computed,
+        # so unrelated instances never wait for each other. The lock is reentrant,
+        # since func may read other lazy properties of the same instance.
+        key = (id(instance), self.name)
+        with _computing_lock:
+            entry = _computing.get(key)
+            if entry is None:
+                entry = _computing[key] = [threading.RLock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                try:
+                    return self._member.__get__(instance, type(instance))
+                except AttributeError:
+                    value = self.func(instance)
+                    self._member.__set__(instance, value)
+                    return value
+        finally:
+            with _computing_lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del _computing[key]
+
+
+def _make_lazy_getattr(fallback=None):
+    def __getattr__(self, name):
+        prop = type(self)._lazy_properties.get(name)
+        if prop is not None:
+            return prop.compute(self)
+        if fallback is not None:
+            return fallback(self, name)
+        raise AttributeError('{!r} object has no attribute {!r}'.format(
+            type(self).__name__, name))
+    return __getattr__
+
+
+# Example use
+
+
+class SlottedCircle:
+    __slots__ = ('radius', '_area', '_perimeter', '_ratio')
+
+    def __init__(self, radius):
+        self.radius = radius
+
+    @slotted_lazyproperty
+    def area(self):
+        print('Computing area')
+        return math.pi * self.radius ** 2
+
+    @slotted_lazyproperty
+    def perimeter(self):
+        print('Computing perimeter')
+        return 2 * math.pi * self.radius
+
+    @slotted_lazyproperty
+    def ratio(self):
+        return self.perimeter / self.area
+
+
+"""
+The value is computed once and then read straight from the slot. Deleting the attribute
+discards the cached value:
+>>> c = SlottedCircle(4.0)
+>>> c.area
+Computing area
+50.26548245743669
+>>> c.area
+50.26548245743669
+>>> c.radius = 5.0
+>>> del c.area
+>>> c.area
+Computing area
+78.53981633974483
+>>>
+
+A lazy property can use other lazy properties; each of them is still computed once:
+>>> c = SlottedCircle(2.0)
+>>> c.ratio
+Computing perimeter
+Computing area
+1.0
+>>> c.ratio
+1.0
+>>>
+
+After the first access, reading the property costs no more than reading any other slot.
+Since the property is the slot, assigning to it stores a value directly, and deleting it
+discards the cached value. The class gets a __getattr__() method (any __getattr__() it
+defines itself is still called for other names), and looking up the property on the
+class returns the slot's member descriptor.
+"""
+
+
+"""
+A lazyproperty is only safe on objects whose inputs never change: in Circle, setting
+radius leaves the cached area and perimeter untouched. To use lazy evaluation on mutable
+objects, the computed values have to know which attributes they were derived from.
+
+The following pair of descriptors records dependencies while a value is being computed.
+Attributes that feed computed values are declared with watched(). Every watched read
+(and every tracked_lazyproperty read) that happens during a computation is recorded
+against the value being computed. Assigning to a watched attribute then discards only
+the cached values that actually read it, along with anything derived from those values,
+possibly on other objects:
+"""
+
+
+_tracking = threading.local()
+_missing = object()
+
+
+def _record_read(instance, name):
+    # Called on every tracked read; only does work while a value is being computed
+    stack = getattr(_tracking, 'stack', None)
+    if stack:
+        stack[-1].append((instance, name))
+
+
+def _invalidate(instance, name):
+    dependents = instance.__dict__.get('_lazy_dependents')
+    if not dependents:
+        return
+    for ref, dep_name in dependents.pop(name, {}).values():
+        dependent = ref()
+        if dependent is not None and dependent.__dict__.pop(dep_name, _missing) is not _missing:
+            _unlink(dependent, dep_name)
+            _invalidate(dependent, dep_name)
+
+
+def _remove_edges(key, ref, sources):
+    # Remove the entries for a computed value from the dependents of its sources
+    for source_ref, source_name in sources:
+        source = source_ref()
+        if source is None:
+            continue
+        edges = source.__dict__.get('_lazy_dependents', {}).get(source_name)
+        if edges and edges.get(key, (None,))[0] is ref:
+            del edges[key]
+
+
+def _unlink(instance, name):
+    # Forget what the (discarded) value of instance.name was computed from
+    entry = instance.__dict__.get('_lazy_sources', {}).pop(name, None)
+    if entry:
+        _remove_edges((id(instance), name), *entry)
+
+
+class watched:
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, cls):
+        if instance is None:
+            return self
+        _record_read(instance, self.name)
+        try:
+            return instance.__dict__[self.name]
+        except KeyError:
+            raise AttributeError(self.name) from None
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.name] = value
+        _invalidate(instance, self.name)
+
+    def __delete__(self, instance):
+        del instance.__dict__[self.name]
+        _invalidate(instance, self.name)
+
+
+class tracked_lazyproperty:
+    def __init__(self, func):
+        self.func = func
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, cls):
+        if instance is None:
+            return self
+        _record_read(instance, self.name)
+        try:
+            return instance.__dict__[self.name]
+        except KeyError:
+            pass
+        stack = getattr(_tracking, 'stack', None)
+        if stack is None:
+            stack = _tracking.stack = []
+        stack.append([])
+        try:
+            value = self.func(instance)
+        finally:
+            reads = stack.pop()
+        instance.__dict__[self.name] = value
+        # Register this value as a dependent of everything it read. Sources only hold
+        # weak references to their dependents, and the entries are removed when the
+        # dependent goes away.
+        key = (id(instance), self.name)
+        sources = [(weakref.ref(source), source_name) for source, source_name in reads]
+        ref = weakref.ref(instance, lambda ref: _remove_edges(key, ref, sources))
+        for source, source_name in reads:
+            dependents = source.__dict__.setdefault('_lazy_dependents', {})
+            dependents.setdefault(source_name, {})[key] = (ref, self.name)
+        instance.__dict__.setdefault('_lazy_sources', {})[self.name] = (ref, sources)
+        return value
+
+    def __set__(self, instance, value):
+        raise AttributeError("can't set attribute")
+
+    def __delete__(self, instance):
+        if instance.__dict__.pop(self.name, _missing) is not _missing:
+            _unlink(instance, self.name)
+            _invalidate(instance, self.name)
+
+
+# Example use
+
+
+class TrackedCircle:
+    radius = watched()
+
+    def __init__(self, radius):
+        self.radius = radius
+
+    @tracked_lazyproperty
+    def area(self):
+        print('Computing area')
+        return math.pi * self.radius ** 2
+
+    @tracked_lazyproperty
+    def perimeter(self):
+        print('Computing perimeter')
+        return 2 * math.pi * self.radius
+
+
+class Drawing:
+    def __init__(self, *circles):
+        self.circles = circles
+
+    @tracked_lazyproperty
+    def total_area(self):
+        print('Computing total area')
+        return sum(c.area for c in self.circles)
+
+
+"""
+Here is how it behaves. Changing the radius of one circle recomputes that circle's
+area and the total, but nothing else:
+>>> a = TrackedCircle(1.0)
+>>> b = TrackedCircle(2.0)
+>>> d = Drawing(a, b)
+>>> d.total_area
+Computing total area
+Computing area
+Computing area
+15.707963267948966
+>>> b.perimeter
+Computing perimeter
+12.566370614359172
+>>> a.radius = 3.0
+>>> d.total_area
+Computing total area
+Computing area
+40.840704496667314
+>>> b.perimeter
+12.566370614359172
+>>>
+
+Dependencies are recorded per instance. When a cached value is discarded, its entries
+are removed from everything it read, and the next computation records them afresh, so
+a function that reads different attributes depending on its inputs is handled
+correctly. Sources only keep weak references to the values derived from them, so a
+Drawing doesn't live on just because its circles do (the instances must support weak
+references). Reads of plain (undeclared) attributes are not tracked.
+"""
+
+
+def _benchmark(number=200000):
+    from timeit import timeit
+
+    class PlainCircle:
+        def __init__(self, radius):
+            self.radius = radius
+
+        @lazyproperty
+        def area(self):
+            return math.pi * self.radius ** 2
+
+    class FastCircle:
+        __slots__ = ('radius', '_area')
+
+        def __init__(self, radius):
+            self.radius = radius
+
+        @slotted_lazyproperty
+        def area(self):
+            return math.pi * self.radius ** 2
+
+    for cls in (PlainCircle, FastCircle):
+        first = timeit(lambda: cls(4.0).area, number=number)
+        c = cls(4.0)
+        c.area
+        repeated = timeit(lambda: c.area, number=number)
+        print('{:12} first access: {:.3f} usec   repeated access: {:.3f} usec'.format(
+            cls.__name__, first / number * 1e6, repeated / number * 1e6))
+
+
+if __name__ == '__main__':
+    _benchmark()
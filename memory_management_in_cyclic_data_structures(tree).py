@@ -32,10 +32,10 @@ class Node:
         return self._parent if self._parent is None else self._parent()
 
     @parent.setter
-    def parent(self, node_: Node):
+    def parent(self, node_: 'Node'):
         self._parent = weakref.ref(node_)
 
-    def add_child(self, node_: Node):
+    def add_child(self, node_: 'Node'):
         self.children.append(node_)
         node_.parent = self
 
@@ -91,7 +91,7 @@ class Tree:
                 child = children.pop(0)
                 yield child
                 if child.children:
-                    stack.append(child.children)
+                    stack.append(child.children.copy())
             else:
                 stack.pop()
 
@@ -106,10 +106,10 @@ class Tree:
         All parent nodes and their parent nodes - see :any:`ancestors`.
         """
         parents = []
-        node_ = n
-        while node_:
+        node_ = n.parent
+        while node_ is not None:
+            parents.insert(0, node_)
             node_ = node_.parent
-            parents.insert(0, node)
             # parents.append(node)
         return parents
 
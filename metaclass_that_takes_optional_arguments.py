@@ -33,3 +33,309 @@ class MyMeta(type):
 
 class Spam(metaclass=MyMeta, debug=True, synchronize=True):
     ...
+
+
+"""
+As a more concrete example, here is a version of MyMeta that actually implements the
+synchronize option. When it is set, every public method of the class is wrapped so
+that it runs while holding a lock belonging to the instance. The option also selects
+the kind of lock:
+
+    synchronize=True or 'rlock'   a reentrant lock (methods may call each other)
+    synchronize='lock'            a plain lock (slightly faster, but not reentrant)
+    synchronize='rwlock'          a reader/writer lock: methods marked with @readonly
+                                  run concurrently, all others run exclusively
+
+The lock is created on first use, so instances that are never shared between threads
+don't pay for it beyond the wrapper call:
+"""
+
+
+import threading
+import weakref
+from functools import wraps
+from time import perf_counter
+from types import FunctionType
+
+
+def readonly(func):
+    """
+    Mark a method as not modifying the instance (for synchronize='rwlock')
+    """
+    func.__readonly__ = True
+    return func
+
+
+class RWLock:
+    """
+    A reader/writer lock. Any number of readers can hold it at the same time, but
+    writers get exclusive access. Waiting writers block new readers, so that a steady
+    stream of readers cannot starve them.
+    """
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writing = False
+        self._waiting_writers = 0
+
+    def acquire_read(self):
+        with self._cond:
+            while self._writing or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        with self._cond:
+            self._waiting_writers += 1
+            while self._writing or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writing = True
+
+    def release_write(self):
+        with self._cond:
+            self._writing = False
+            self._cond.notify_all()
+
+
+_lock_types = {
+    True: threading.RLock,
+    'rlock': threading.RLock,
+    'lock': threading.Lock,
+    'rwlock': RWLock,
+}
+
+# Guards the creation of per-instance locks
+_creation_lock = threading.Lock()
+
+# Per-instance locks are kept outside of the instances, keyed by id(), so that they
+# don't end up in pickles, copies or vars(). A weak reference to each instance removes
+# its lock when the instance goes away.
+_instance_locks = {}
+_instance_refs = {}
+
+
+def _forget_lock(ref, key):
+    if _instance_refs.get(key) is ref:
+        del _instance_refs[key]
+        _instance_locks.pop(key, None)
+
+
+def _instance_lock(instance, factory):
+    key = id(instance)
+    with _creation_lock:
+        lock = _instance_locks.get(key)
+        if lock is None:
+            _instance_refs[key] = weakref.ref(instance, lambda ref: _forget_lock(ref, key))
+            lock = _instance_locks[key] = factory()
+    return lock
+
+
+def _synchronized(func, factory):
+    if factory is RWLock:
+        if getattr(func, '__readonly__', False):
+            @wraps(func)
+            def wrapper(self, *args, **kwargs):
+                lock = _instance_locks.get(id(self)) or _instance_lock(self, factory)
+                lock.acquire_read()
+                try:
+                    return func(self, *args, **kwargs)
+                finally:
+                    lock.release_read()
+        else:
+            @wraps(func)
+            def wrapper(self, *args, **kwargs):
+                lock = _instance_locks.get(id(self)) or _instance_lock(self, factory)
+                lock.acquire_write()
+                try:
+                    return func(self, *args, **kwargs)
+                finally:
+                    lock.release_write()
+    else:
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            lock = _instance_locks.get(id(self)) or _instance_lock(self, factory)
+            with lock:
+                return func(self, *args, **kwargs)
+    return wrapper
+
+
+def _timed(func, counters, name):
+    # counters[name] holds [calls, total time, max time] in seconds. name is the
+    # attribute name in the class, which differs from func.__name__ for aliases.
+    entry = counters[name] = [0, 0.0, 0.0]
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = perf_counter() - start
+            entry[0] += 1
+            entry[1] += elapsed
+            if elapsed > entry[2]:
+                entry[2] = elapsed
+    return wrapper
+
+
+def _make_stats(counters):
+    def __stats__(cls):
+        return {name: {'calls': calls, 'total': total, 'max': max_time}
+                for name, (calls, total, max_time) in counters.items()}
+    return classmethod(__stats__)
+
+
+class MyMeta(type):
+    # Optional
+    @classmethod
+    def __prepare__(cls, name, bases, *, debug=False, synchronize=False):
+        return super().__prepare__(name, bases)
+
+    # Required
+    def __new__(cls, name, bases, ns, *, debug=False, synchronize=False):
+        if synchronize:
+            try:
+                factory = _lock_types[synchronize]
+            except (KeyError, TypeError):
+                raise ValueError('Bad synchronize option: {!r}'.format(synchronize)) from None
+            for attr, value in list(ns.items()):
+                if not attr.startswith('_') and isinstance(value, FunctionType):
+                    ns[attr] = _synchronized(value, factory)
+        if debug:
+            # Timing goes around the locking, so time spent waiting is included
+            counters = {}
+            for attr, value in list(ns.items()):
+                if isinstance(value, FunctionType):
+                    ns[attr] = _timed(value, counters, attr)
+                elif isinstance(value, (classmethod, staticmethod)):
+                    ns[attr] = type(value)(_timed(value.__func__, counters, attr))
+            ns['__stats__'] = _make_stats(counters)
+        return super().__new__(cls, name, bases, ns)
+
+    # Required
+    def __init__(self, name, bases, ns, *, debug=False, synchronize=False):
+        super().__init__(name, bases, ns)
+
+
+# Example
+class Account(metaclass=MyMeta, synchronize='rwlock'):
+    def __init__(self, balance=0):
+        self.balance = balance
+
+    @readonly
+    def get_balance(self):
+        return self.balance
+
+    def deposit(self, amount):
+        self.balance += amount
+
+
+"""
+Here deposit() runs exclusively, while any number of threads can call get_balance() at
+the same time:
+>>> a = Account(100)
+>>> a.deposit(50)
+>>> a.get_balance()
+150
+>>>
+
+The locks are created on first use and are not part of the instance state, so
+synchronized objects can still be pickled and copied (a copy gets a lock of its own).
+The instances must support weak references.
+
+With a plain lock or a reader/writer lock, a method that calls another public method
+on the same instance deadlocks, since the lock is already held. Use the default reentrant
+lock for classes whose methods call each other.
+"""
+
+
+"""
+The debug option is handled in the same way. With debug=True, every method of the
+class (including special methods, class methods and static methods) is wrapped with a
+timer that counts calls and accumulates the total and maximum time per method. The
+numbers are returned by the __stats__() class method:
+>>> class Spam(metaclass=MyMeta, debug=True):
+...     def __init__(self, n):
+...         self.n = n
+...     def work(self):
+...         return sum(range(self.n))
+...
+>>> s = Spam(1000)
+>>> s.work()
+499500
+>>> stats = Spam.__stats__()
+>>> stats['work']['calls'], stats['__init__']['calls']
+(1, 1)
+>>>
+
+With debug=False nothing is wrapped at all (and there is no __stats__()), so a class
+only pays for the timers while it is being profiled. The counters are updated without
+a lock; under heavy concurrent use a few updates may be lost, which is fine for
+profiling purposes.
+"""
+
+
+def _benchmark(nthreads=8, ncalls=200, write_every=20):
+    import time
+
+    def make(option):
+        class Cache(metaclass=MyMeta, synchronize=option):
+            def __init__(self):
+                self.data = {}
+
+            @readonly
+            def lookup(self, key):
+                time.sleep(0.0001)      # Stand-in for work that releases the GIL
+                return self.data.get(key)
+
+            def store(self, key, value):
+                self.data[key] = value
+        return Cache()
+
+    def worker(cache):
+        for i in range(ncalls):
+            if i % write_every:
+                cache.lookup(i)
+            else:
+                cache.store(i, i)
+
+    for option in ('rlock', 'rwlock'):
+        cache = make(option)
+        threads = [threading.Thread(target=worker, args=(cache,)) for _ in range(nthreads)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        print('{:7} {} threads: {:8.0f} calls/sec'.format(
+            option, nthreads, nthreads * ncalls / elapsed))
+
+
+def _benchmark_debug(number=1000000):
+    from timeit import timeit
+
+    class Plain(metaclass=MyMeta):
+        def spam(self):
+            pass
+
+    class Debug(metaclass=MyMeta, debug=True):
+        def spam(self):
+            pass
+
+    for cls in (Plain, Debug):
+        obj = cls()
+        print('{:6} method call: {:.3f} usec'.format(
+            cls.__name__, timeit(obj.spam, number=number) / number * 1e6))
+
+
+if __name__ == '__main__':
+    _benchmark()
+    _benchmark_debug()
@@ -36,4 +36,508 @@ Item('foo')
 >>> q.pop()
 Item('grok')
 >>>
-"""
\ No newline at end of file
+"""
+
+
+"""
+The queue above can only push and pop. Changing the priority of an item that is already
+queued, or cancelling it, usually means pushing a duplicate and skipping stale entries
+when they come out later. That keeps dead entries in the heap and makes len()
+meaningless.
+
+An indexed heap avoids this by remembering where every item currently sits in the heap.
+Since the heap is maintained by hand, each sift step updates that position map, and any
+entry can then be moved up or down (or removed) in O(log n). Items must be hashable.
+Entries are lists of the form [-priority, index, item], so the ordering (highest priority
+first, FIFO among equal priorities) is the same as in PriorityQueue:
+"""
+
+
+class IndexedPriorityQueue:
+    def __init__(self, items=()):
+        # items is an iterable of (item, priority) pairs, heapified in one go
+        self._index = 0
+        entries = {}
+        for item, priority in items:
+            entries[item] = [-priority, self._index, item]
+            self._index += 1
+        self._heap = list(entries.values())
+        heapq.heapify(self._heap)
+        self._pos = {entry[2]: i for i, entry in enumerate(self._heap)}
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __contains__(self, item):
+        return item in self._pos
+
+    def push(self, item, priority):
+        # Pushing an item that is already queued just changes its priority
+        if item in self._pos:
+            self.update(item, priority)
+            return
+        entry = [-priority, self._index, item]
+        self._index += 1
+        self._heap.append(entry)
+        self._siftup(len(self._heap) - 1)
+
+    def pop(self):
+        heap = self._heap
+        last = heap.pop()
+        if heap:
+            top = heap[0]
+            heap[0] = last
+            self._siftdown(0)
+        else:
+            top = last
+        del self._pos[top[2]]
+        return top[2]
+
+    def peek(self):
+        return self._heap[0][2]
+
+    def priority(self, item):
+        return -self._heap[self._pos[item]][0]
+
+    def update(self, item, priority):
+        # The item is treated as freshly pushed, so it goes after existing entries
+        # with the same priority
+        i = self._pos[item]
+        entry = self._heap[i]
+        entry[0] = -priority
+        entry[1] = self._index
+        self._index += 1
+        self._siftup(i)
+        self._siftdown(self._pos[item])
+
+    def remove(self, item):
+        i = self._pos.pop(item)
+        heap = self._heap
+        last = heap.pop()
+        if i < len(heap):
+            heap[i] = last
+            self._siftup(i)
+            self._siftdown(self._pos[last[2]])
+
+    def _siftup(self, i):
+        # Move the entry at i towards the root
+        heap = self._heap
+        pos = self._pos
+        entry = heap[i]
+        while i:
+            parent = (i - 1) >> 1
+            p = heap[parent]
+            if entry < p:
+                heap[i] = p
+                pos[p[2]] = i
+                i = parent
+            else:
+                break
+        heap[i] = entry
+        pos[entry[2]] = i
+
+    def _siftdown(self, i):
+        # Move the entry at i towards the leaves
+        heap = self._heap
+        pos = self._pos
+        size = len(heap)
+        entry = heap[i]
+        child = 2 * i + 1
+        while child < size:
+            right = child + 1
+            if right < size and heap[right] < heap[child]:
+                child = right
+            c = heap[child]
+            if c < entry:
+                heap[i] = c
+                pos[c[2]] = i
+                i = child
+                child = 2 * i + 1
+            else:
+                break
+        heap[i] = entry
+        pos[entry[2]] = i
+
+
+"""
+For example:
+>>> q = IndexedPriorityQueue([('foo', 1), ('bar', 5), ('spam', 4)])
+>>> q.push('grok', 1)
+>>> q.update('foo', 10)
+>>> q.remove('bar')
+>>> len(q), 'bar' in q, q.peek()
+(3, False, 'foo')
+>>> [q.pop() for _ in range(len(q))]
+['foo', 'spam', 'grok']
+>>>
+"""
+
+
+"""
+Neither queue does any locking, and pop() raises IndexError as soon as the queue is
+empty, so they cannot be shared between producer and consumer threads. The following
+variant guards the heap with a condition variable. pop() can block (optionally with a
+timeout), and pop_many() returns up to n items per lock acquisition, which cuts down on
+lock traffic when consumers can process work in batches:
+"""
+
+
+import threading
+
+
+class ThreadSafePriorityQueue(PriorityQueue):
+    def __init__(self):
+        super().__init__()
+        self._not_empty = threading.Condition(threading.Lock())
+
+    def __len__(self):
+        return len(self._queue)
+
+    def push(self, item, priority):
+        with self._not_empty:
+            super().push(item, priority)
+            self._not_empty.notify()
+
+    def _wait(self, block, timeout):
+        # Must be called with the lock held; returns False if still empty
+        if not block:
+            return bool(self._queue)
+        return self._not_empty.wait_for(lambda: self._queue, timeout)
+
+    def pop(self, block=True, timeout=None):
+        with self._not_empty:
+            if not self._wait(block, timeout):
+                raise IndexError('pop from an empty priority queue')
+            return heapq.heappop(self._queue)[-1]
+
+    def pop_many(self, n, block=True, timeout=None):
+        # Block until at least one item is available, then take up to n of them
+        with self._not_empty:
+            if not self._wait(block, timeout):
+                raise IndexError('pop from an empty priority queue')
+            queue = self._queue
+            return [heapq.heappop(queue)[-1] for _ in range(min(n, len(queue)))]
+
+
+"""
+For asyncio code, the same idea works with futures instead of a condition variable.
+Pushing never blocks, so push() is a plain method; pop() and pop_many() are coroutines
+that wait until an item arrives. Use asyncio.wait_for() to put a time limit on them:
+"""
+
+
+import collections
+
+
+class AsyncPriorityQueue(PriorityQueue):
+    def __init__(self):
+        super().__init__()
+        self._waiters = collections.deque()
+
+    def __len__(self):
+        return len(self._queue)
+
+    def push(self, item, priority):
+        super().push(item, priority)
+        self._wakeup_next()
+
+    def _wakeup_next(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                break
+
+    async def _wait(self):
+        # asyncio is imported here, so that importing this module doesn't pull it in
+        import asyncio
+        while not self._queue:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except BaseException:
+                waiter.cancel()
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+                # Pass on a wakeup that was meant for us
+                if self._queue and not waiter.cancelled():
+                    self._wakeup_next()
+                raise
+
+    async def pop(self):
+        await self._wait()
+        return super().pop()
+
+    async def pop_many(self, n):
+        await self._wait()
+        queue = self._queue
+        return [heapq.heappop(queue)[-1] for _ in range(min(n, len(queue)))]
+
+
+"""
+Every entry of PriorityQueue is a 3-tuple holding a boxed priority, a boxed index and a
+reference to the item, which comes to roughly 100 bytes per entry before counting the
+item itself. For queues holding tens of millions of timers, that overhead matters more
+than anything else.
+
+If the items are integer handles (timer ids, indices into a table, and so on), the whole
+queue can be kept in three parallel typed arrays instead: one for the priorities, one
+for the sequence numbers and one for the handles. Each entry then costs 24 bytes, and
+the queue runs its own sift operations over the arrays:
+"""
+
+
+from array import array
+
+
+class CompactPriorityQueue:
+    def __init__(self, handle_type='q'):
+        self._keys = array('d')         # -priority
+        self._seqs = array('Q')         # insertion order, for FIFO tie-breaking
+        self._handles = array(handle_type)
+        self._index = 0
+
+    def __len__(self):
+        return len(self._keys)
+
+    def push(self, handle, priority):
+        self._keys.append(-priority)
+        self._seqs.append(self._index)
+        self._handles.append(handle)
+        self._index += 1
+        self._siftup(len(self._keys) - 1)
+
+    def pop(self):
+        keys, seqs, handles = self._keys, self._seqs, self._handles
+        if not keys:
+            raise IndexError('pop from an empty priority queue')
+        top = handles[0]
+        key, seq, handle = keys.pop(), seqs.pop(), handles.pop()
+        if keys:
+            keys[0], seqs[0], handles[0] = key, seq, handle
+            self._siftdown(0)
+        return top
+
+    def peek(self):
+        return self._handles[0]
+
+    def _siftup(self, i):
+        keys, seqs, handles = self._keys, self._seqs, self._handles
+        key, seq, handle = keys[i], seqs[i], handles[i]
+        while i:
+            parent = (i - 1) >> 1
+            pkey = keys[parent]
+            if key < pkey or (key == pkey and seq < seqs[parent]):
+                keys[i], seqs[i], handles[i] = pkey, seqs[parent], handles[parent]
+                i = parent
+            else:
+                break
+        keys[i], seqs[i], handles[i] = key, seq, handle
+
+    def _siftdown(self, i):
+        keys, seqs, handles = self._keys, self._seqs, self._handles
+        size = len(keys)
+        key, seq, handle = keys[i], seqs[i], handles[i]
+        child = 2 * i + 1
+        while child < size:
+            ckey = keys[child]
+            right = child + 1
+            if right < size:
+                rkey = keys[right]
+                if rkey < ckey or (rkey == ckey and seqs[right] < seqs[child]):
+                    child = right
+                    ckey = rkey
+            if ckey < key or (ckey == key and seqs[child] < seq):
+                keys[i], seqs[i], handles[i] = ckey, seqs[child], handles[child]
+                i = child
+                child = 2 * i + 1
+            else:
+                break
+        keys[i], seqs[i], handles[i] = key, seq, handle
+
+
+"""
+It is used just like PriorityQueue, except that the items are integers:
+>>> q = CompactPriorityQueue()
+>>> q.push(1, 1)
+>>> q.push(2, 5)
+>>> q.push(3, 4)
+>>> q.push(4, 1)
+>>> [q.pop() for _ in range(len(q))]
+[2, 3, 1, 4]
+>>>
+
+The sift operations run in Python rather than in C like heapq, so each operation is
+slower than with the tuple heap; what you get in exchange is a queue that is several
+times smaller and that does not create any objects per entry for the garbage collector
+to track.
+"""
+
+
+def _benchmark_indexed(n=10000, ops=200000):
+    import random
+    import time
+
+    class LazyPriorityQueue(PriorityQueue):
+        # The usual workaround: push duplicates and skip stale entries on pop
+        def __init__(self):
+            super().__init__()
+            self._entries = {}
+
+        def push(self, item, priority):
+            entry = [-priority, self._index, item, True]
+            old = self._entries.get(item)
+            if old is not None:
+                old[3] = False
+            self._entries[item] = entry
+            heapq.heappush(self._queue, entry)
+            self._index += 1
+
+        update = push
+
+        def remove(self, item):
+            self._entries.pop(item)[3] = False
+
+        def pop(self):
+            while True:
+                entry = heapq.heappop(self._queue)
+                if entry[3]:
+                    del self._entries[entry[2]]
+                    return entry[2]
+
+    random.seed(0)
+    workload = []
+    for _ in range(ops):
+        workload.append((random.random(), random.randrange(n), random.random()))
+
+    for cls in (LazyPriorityQueue, IndexedPriorityQueue):
+        q = cls()
+        for i in range(n):
+            q.push(i, random.random())
+        queued = set(range(n))
+        start = time.perf_counter()
+        for r, item, priority in workload:
+            if item in queued:
+                if r < 0.6:
+                    q.update(item, priority)
+                elif r < 0.8:
+                    q.remove(item)
+                    queued.discard(item)
+                else:
+                    queued.discard(q.pop())
+            else:
+                q.push(item, priority)
+                queued.add(item)
+        elapsed = time.perf_counter() - start
+        size = len(q._queue) if cls is LazyPriorityQueue else len(q._heap)
+        print('{:22} {:.0f} ops/sec, {} heap entries for {} live items'.format(
+            cls.__name__, ops / elapsed, size, len(queued)))
+
+
+def _benchmark_threaded(n=200000):
+    import asyncio
+    import time
+
+    def run(workers, batch):
+        q = ThreadSafePriorityQueue()
+        stop = object()
+
+        def produce(count):
+            for i in range(count):
+                q.push(i, i % 100)
+
+        def consume():
+            while True:
+                items = q.pop_many(batch) if batch > 1 else [q.pop()]
+                if stop in items:
+                    # Leave one sentinel for every other consumer
+                    for _ in range(items.count(stop) - 1):
+                        q.push(stop, float('-inf'))
+                    return
+
+        producers = [threading.Thread(target=produce, args=(n // workers,))
+                     for _ in range(workers)]
+        consumers = [threading.Thread(target=consume) for _ in range(workers)]
+        start = time.perf_counter()
+        for t in producers + consumers:
+            t.start()
+        for t in producers:
+            t.join()
+        for _ in consumers:
+            q.push(stop, float('-inf'))
+        for t in consumers:
+            t.join()
+        return n / (time.perf_counter() - start)
+
+    for workers in (1, 4, 16):
+        print('threads {:2} x {:2}: pop {:8.0f} items/sec   pop_many(100) {:8.0f} items/sec'.format(
+            workers, workers, run(workers, 1), run(workers, 100)))
+
+    async def run_async(workers):
+        q = AsyncPriorityQueue()
+
+        async def produce(count):
+            for i in range(count):
+                q.push(i, i % 100)
+                if i % 100 == 0:
+                    await asyncio.sleep(0)
+
+        async def consume():
+            while True:
+                items = await q.pop_many(100)
+                if None in items:
+                    for _ in range(items.count(None) - 1):
+                        q.push(None, float('-inf'))
+                    return
+
+        start = time.perf_counter()
+        consumers = [asyncio.ensure_future(consume()) for _ in range(workers)]
+        await asyncio.gather(*(produce(n // workers) for _ in range(workers)))
+        for _ in consumers:
+            q.push(None, float('-inf'))
+        await asyncio.gather(*consumers)
+        return n / (time.perf_counter() - start)
+
+    for workers in (1, 4, 16):
+        print('asyncio {:2} x {:2}: pop_many(100) {:8.0f} items/sec'.format(
+            workers, workers, asyncio.run(run_async(workers))))
+
+
+def _benchmark_compact(n=1000000):
+    import random
+    import time
+    import tracemalloc
+
+    priorities = [random.random() for _ in range(n)]
+
+    def fill(cls):
+        q = cls()
+        for i, priority in enumerate(priorities):
+            q.push(i, priority)
+        return q
+
+    for cls in (PriorityQueue, CompactPriorityQueue):
+        # Memory is measured in a separate pass, since tracemalloc slows down
+        # every allocation and would distort the timings
+        tracemalloc.start()
+        q = fill(cls)
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del q
+        start = time.perf_counter()
+        q = fill(cls)
+        pushed = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(n):
+            q.pop()
+        popped = time.perf_counter() - start
+        print('{:22} {:6.1f} bytes/entry   push {:8.0f} ops/sec   pop {:8.0f} ops/sec'.format(
+            cls.__name__, size / n, n / pushed, n / popped))
+
+if __name__ == '__main__':
+    _benchmark_indexed()
+    _benchmark_threaded()
+    _benchmark_compact()
@@ -13,4 +13,558 @@ around a small fixed-sized array, much like a tuple or list. Attribute names lis
 __slots__ specifier are internally mapped to specific indices within this array. A side
 effect of using slots is that it is no longer possible to add new attributes to instances—
 you are restricted to only those attribute names listed in the __slots__ specifier.
-"""
\ No newline at end of file
+"""
+
+"""
+Writing such classes by hand gets tedious when there are dozens of record types, and the
+hand-written Date above doesn't even support comparison or a useful repr(). Much like
+collections.namedtuple(), the following factory generates the source code for a slotted
+class and executes it. The generated __init__() assigns each field directly, with no
+loops or *args processing, and equality, hashing, repr() and pickling are generated as
+well:
+"""
+
+
+import collections.abc
+import keyword
+import sys
+from array import array
+from operator import attrgetter
+
+# self is the first argument of the generated methods, Array the attribute holding the
+# array class
+_reserved_names = {'self', 'Array'}
+
+
+def record(typename, field_names, typecodes=None, module=None):
+    if isinstance(field_names, str):
+        field_names = field_names.replace(',', ' ').split()
+    field_names = tuple(map(str, field_names))
+    for name in (typename,) + field_names:
+        if not name.isidentifier() or keyword.iskeyword(name):
+            raise ValueError('Invalid name: {!r}'.format(name))
+    seen = set()
+    for name in field_names:
+        if name.startswith('_'):
+            raise ValueError('Field names cannot start with an underscore: {!r}'.format(name))
+        if name in _reserved_names:
+            raise ValueError('Field name is reserved: {!r}'.format(name))
+        if name in seen:
+            raise ValueError('Duplicate field name: {!r}'.format(name))
+        seen.add(name)
+
+    args = ', '.join(field_names)
+    # Tuple expressions like (self.year, self.month, self.day,)
+    values = '({})'.format(''.join('self.{},'.format(name) for name in field_names))
+    others = '({})'.format(''.join('other.{},'.format(name) for name in field_names))
+    fmt = '{}(' + ', '.join('{}={{!r}}'.format(name) for name in field_names) + ')'
+    source = (
+        'def __init__(self, {args}):\n'
+        '{assignments}\n'
+        'def __eq__(self, other):\n'
+        '    if other.__class__ is self.__class__:\n'
+        '        return {values} == {others}\n'
+        '    return NotImplemented\n'
+        'def __hash__(self):\n'
+        '    return hash({values})\n'
+        'def __repr__(self):\n'
+        '    return {fmt!r}.format(self.__class__.__name__, *{values})\n'
+        'def __reduce__(self):\n'
+        '    return (self.__class__, {values})\n'
+    ).format(
+        args=args, values=values, others=others, fmt=fmt,
+        assignments=''.join('    self.{0} = {0}\n'.format(name) for name in field_names)
+                    or '    pass\n')
+    namespace = {}
+    exec(source, namespace)
+
+    clsdict = {
+        '__slots__': field_names,
+        '_fields': field_names,
+        '__doc__': '{}({})'.format(typename, args),
+    }
+    for name in ('__init__', '__eq__', '__hash__', '__repr__', '__reduce__'):
+        func = namespace[name]
+        func.__qualname__ = '{}.{}'.format(typename, name)
+        clsdict[name] = func
+    cls = type(typename, (), clsdict)
+
+    if typecodes is not None:
+        if isinstance(typecodes, str):
+            typecodes = dict(zip(field_names, typecodes))
+        cls.Array = type(typename + 'Array', (RecordArray,), {
+            'record': cls,
+            'typecodes': typecodes,
+        })
+
+    # Like namedtuple(), record the caller's module so that pickling works
+    if module is None:
+        try:
+            module = sys._getframe(1).f_globals.get('__name__', '__main__')
+        except (AttributeError, ValueError):
+            pass
+    if module is not None:
+        cls.__module__ = module
+        if typecodes is not None:
+            cls.Array.__module__ = module
+    return cls
+
+
+class RecordArray(collections.abc.MutableSequence):
+    """
+    Columnar storage for many records: each field is kept in its own typed array, and
+    record objects are only created when items are accessed.
+    """
+    record = None
+    typecodes = None
+
+    def __init__(self, records=()):
+        self._columns = {name: array(self.typecodes[name]) for name in self.record._fields}
+        self.extend(records)
+
+    def __len__(self):
+        for column in self._columns.values():
+            return len(column)
+        return 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            result = type(self)()
+            for name, column in self._columns.items():
+                result._columns[name] = column[index]
+            return result
+        return self.record(*[column[index] for column in self._columns.values()])
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            raise TypeError('slice assignment is not supported')
+        for name, column in self._columns.items():
+            column[index] = getattr(value, name)
+
+    def __delitem__(self, index):
+        for column in self._columns.values():
+            del column[index]
+
+    def __iter__(self):
+        return map(self.record, *self._columns.values())
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, list(self))
+
+    def insert(self, index, value):
+        for name, column in self._columns.items():
+            column.insert(index, getattr(value, name))
+
+    def append(self, value):
+        for name, column in self._columns.items():
+            column.append(getattr(value, name))
+
+    def extend(self, records):
+        records = list(records)
+        for name, column in self._columns.items():
+            column.extend(map(attrgetter(name), records))
+
+    def column(self, name):
+        return self._columns[name]
+
+    def __reduce__(self):
+        return (_rebuild_record_array, (self.record, self._columns))
+
+
+def _rebuild_record_array(record, columns):
+    result = record.Array()
+    result._columns = columns
+    return result
+
+
+"""
+Here is an example:
+>>> Date = record('Date', 'year month day', typecodes='hbb')
+>>> d = Date(2012, 12, 21)
+>>> d
+Date(year=2012, month=12, day=21)
+>>> d == Date(2012, 12, 21)
+True
+>>> d.hour = 0
+Traceback (most recent call last):
+...
+AttributeError: 'Date' object has no attribute 'hour'
+>>>
+
+If typecodes are given (in the format used by the array module), the class also gets an
+Array attribute: a list-like container that stores its records column by column, using
+a few bytes per field rather than a whole object per record:
+>>> dates = Date.Array([Date(2012, 12, 21), Date(2013, 1, 1)])
+>>> dates.append(Date(2014, 6, 30))
+>>> len(dates), dates[-1]
+(3, Date(year=2014, month=6, day=30))
+>>> max(dates.column('year'))
+2014
+>>>
+
+Records are mutable, but they define __hash__() from their current field values, so don't
+change a record while it is being used as a dictionary key or set member.
+"""
+
+
+"""
+Even with __slots__, ten million Date objects take hundreds of megabytes, and computing
+an aggregate means touching every one of them. When dates are handled in bulk, it is
+better not to create objects at all. DateArray stores the years, months and days in
+three packed arrays (2 + 1 + 1 bytes per date) and works on whole columns at once.
+
+Comparisons, filters and sorting all use a single integer per date, year * 512 +
+month * 32 + day, which orders the same way as the dates do. It is built on demand with
+map() over the columns, so the loops run in C. Indexing hands out small DateView objects
+that read through to the arrays rather than copying the values:
+"""
+
+
+from itertools import compress, repeat
+from operator import add, and_, mul, eq, ne, lt, le, gt, ge
+
+
+def _date_key(date):
+    return (date.year << 9) | (date.month << 5) | date.day
+
+
+class DateView:
+    __slots__ = ['_dates', '_index']
+
+    def __init__(self, dates, index):
+        self._dates = dates
+        self._index = index
+
+    @property
+    def year(self):
+        return self._dates.years[self._index]
+
+    @property
+    def month(self):
+        return self._dates.months[self._index]
+
+    @property
+    def day(self):
+        return self._dates.days[self._index]
+
+    def to_date(self):
+        return Date(self.year, self.month, self.day)
+
+    def __repr__(self):
+        return 'DateView({}, {}, {})'.format(self.year, self.month, self.day)
+
+    # Views compare by date, with each other and with anything that has year, month
+    # and day attributes, such as Date
+    def _compare(self, op, other):
+        try:
+            return op(_date_key(self), _date_key(other))
+        except AttributeError:
+            return NotImplemented
+
+    def __eq__(self, other):
+        return self._compare(eq, other)
+
+    def __ne__(self, other):
+        return self._compare(ne, other)
+
+    def __lt__(self, other):
+        return self._compare(lt, other)
+
+    def __le__(self, other):
+        return self._compare(le, other)
+
+    def __gt__(self, other):
+        return self._compare(gt, other)
+
+    def __ge__(self, other):
+        return self._compare(ge, other)
+
+    def __hash__(self):
+        return hash(_date_key(self))
+
+
+class DateArray(collections.abc.Sequence):
+    def __init__(self, years=(), months=(), days=()):
+        self.years = array('h', years)
+        self.months = array('b', months)
+        self.days = array('b', days)
+        if not len(self.years) == len(self.months) == len(self.days):
+            raise ValueError('years, months and days must have the same length')
+        self._keys = None
+
+    @classmethod
+    def from_dates(cls, dates):
+        dates = list(dates)
+        return cls(map(attrgetter('year'), dates),
+                   map(attrgetter('month'), dates),
+                   map(attrgetter('day'), dates))
+
+    def to_dates(self):
+        return list(map(Date, self.years, self.months, self.days))
+
+    def __len__(self):
+        return len(self.years)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return DateArray(self.years[index], self.months[index], self.days[index])
+        if index < 0:
+            index += len(self.years)
+        if not 0 <= index < len(self.years):
+            raise IndexError('DateArray index out of range')
+        return DateView(self, index)
+
+    def __iter__(self):
+        return map(DateView, repeat(self), range(len(self.years)))
+
+    def __repr__(self):
+        return 'DateArray({} dates)'.format(len(self))
+
+    def append(self, date):
+        self.years.append(date.year)
+        self.months.append(date.month)
+        self.days.append(date.day)
+        self.invalidate()
+
+    def extend(self, dates):
+        other = dates if isinstance(dates, DateArray) else DateArray.from_dates(dates)
+        self.years.extend(other.years)
+        self.months.extend(other.months)
+        self.days.extend(other.days)
+        self.invalidate()
+
+    def invalidate(self):
+        """
+        Discard the cached keys; call this after changing the years, months or days
+        arrays directly
+        """
+        self._keys = None
+
+    def keys(self):
+        """
+        One sortable integer per date
+        """
+        if self._keys is None:
+            years = map(mul, self.years, repeat(512))
+            months = map(mul, self.months, repeat(32))
+            self._keys = array('l', map(add, map(add, years, months), self.days))
+        return self._keys
+
+    # Membership tests go through the integer keys instead of comparing views
+    def __contains__(self, date):
+        try:
+            return _date_key(date) in self.keys()
+        except AttributeError:
+            return False
+
+    def index(self, date, start=0, stop=None):
+        try:
+            key = _date_key(date)
+        except AttributeError:
+            raise ValueError('{!r} is not in DateArray'.format(date)) from None
+        keys = self.keys()
+        try:
+            return keys.index(key, start, len(keys) if stop is None else stop)
+        except ValueError:
+            raise ValueError('{!r} is not in DateArray'.format(date)) from None
+
+    def count(self, date):
+        try:
+            return self.keys().count(_date_key(date))
+        except AttributeError:
+            return 0
+
+    # Vectorized comparisons against a single date, or element by element against
+    # another DateArray of the same length, produce a mask (one byte per date)
+    def _compare(self, op, other):
+        if isinstance(other, DateArray):
+            if len(other) != len(self):
+                raise ValueError('DateArrays must have the same length')
+            return array('b', map(op, self.keys(), other.keys()))
+        try:
+            key = _date_key(other)
+        except AttributeError:
+            return NotImplemented
+        return array('b', map(op, self.keys(), repeat(key)))
+
+    def __eq__(self, date):
+        return self._compare(eq, date)
+
+    def __ne__(self, date):
+        return self._compare(ne, date)
+
+    def __lt__(self, date):
+        return self._compare(lt, date)
+
+    def __le__(self, date):
+        return self._compare(le, date)
+
+    def __gt__(self, date):
+        return self._compare(gt, date)
+
+    def __ge__(self, date):
+        return self._compare(ge, date)
+
+    __hash__ = None
+
+    def select(self, mask):
+        """
+        The dates for which mask is true
+        """
+        return DateArray(compress(self.years, mask),
+                         compress(self.months, mask),
+                         compress(self.days, mask))
+
+    def between(self, start, stop):
+        """
+        The dates d with start <= d < stop
+        """
+        keys = self.keys()
+        return self.select(array('b', map(and_, map(ge, keys, repeat(_date_key(start))),
+                                          map(lt, keys, repeat(_date_key(stop))))))
+
+    def argsort(self, reverse=False):
+        # Sorting plain ints is much faster than sorting with a key function, so the
+        # position is folded into each key as key * n + i and recovered afterwards
+        keys = self.keys()
+        n = len(keys)
+        if not reverse:
+            combined = sorted(map(add, map(mul, keys, repeat(n)), range(n)))
+            return list(map(n.__rmod__, combined))
+        # Count positions down, so that equal dates keep their original order
+        combined = sorted(map(add, map(mul, keys, repeat(n)), range(n - 1, -1, -1)),
+                          reverse=True)
+        return list(map((n - 1).__sub__, map(n.__rmod__, combined)))
+
+    def take(self, indices):
+        indices = list(indices)
+        return DateArray(map(self.years.__getitem__, indices),
+                         map(self.months.__getitem__, indices),
+                         map(self.days.__getitem__, indices))
+
+    def sorted(self, reverse=False):
+        return self.take(self.argsort(reverse))
+
+    def groupby(self, *fields):
+        """
+        Split into a dict of DateArrays, keyed by the values of the given fields
+        """
+        columns = [getattr(self, field + 's') for field in fields]
+        groups = {}
+        for i, key in enumerate(zip(*columns)):
+            groups.setdefault(key if len(fields) > 1 else key[0], []).append(i)
+        return {key: self.take(indices) for key, indices in groups.items()}
+
+    def count_by(self, *fields):
+        """
+        Number of dates for each combination of values of the given fields
+        """
+        columns = [getattr(self, field + 's') for field in fields]
+        keys = zip(*columns) if len(fields) > 1 else columns[0]
+        return collections.Counter(keys)
+
+
+"""
+For example:
+>>> dates = DateArray.from_dates([Date(2012, 12, 21), Date(2011, 3, 1), Date(2012, 1, 5)])
+>>> dates[0].year, dates[-1]
+(2012, DateView(2012, 1, 5))
+>>> list(dates < Date(2012, 6, 1))
+[0, 1, 1]
+>>> dates.select(dates >= Date(2012, 1, 1)).years
+array('h', [2012, 2012])
+>>> [(d.year, d.month, d.day) for d in dates.sorted()]
+[(2011, 3, 1), (2012, 1, 5), (2012, 12, 21)]
+>>> dates.count_by('year')
+Counter({2012: 2, 2011: 1})
+>>> sorted(dates.groupby('year'))
+[2011, 2012]
+>>> Date(2011, 3, 1) in dates, dates.index(Date(2012, 1, 5))
+(True, 2)
+>>> dates[0] == Date(2012, 12, 21), dates[0] < dates[1]
+(True, False)
+>>>
+
+A DateView holds on to its DateArray and index, so it reflects later changes made
+through the arrays; call to_date() for an independent copy. The integer keys are cached
+after the first comparison, so call invalidate() after modifying the years, months or
+days arrays directly (append() and extend() take care of this themselves). Years are stored as signed 16-bit integers, which covers the years
+-32768 to 32767.
+"""
+
+
+def _benchmark(n=100000):
+    import dataclasses
+    import time
+    import tracemalloc
+
+    FastDate = record('FastDate', 'year month day', typecodes='hbb')
+    TupleDate = collections.namedtuple('TupleDate', 'year month day')
+
+    @dataclasses.dataclass
+    class DataDate:
+        year: int
+        month: int
+        day: int
+
+    def make_dict(year, month, day):
+        return {'year': year, 'month': month, 'day': day}
+
+    # Field values below 256 are cached by the interpreter, so only the records count
+    rows = [(2000 + i % 200, 1 + i % 12, 1 + i % 28) for i in range(n)]
+    for name, factory in (('dict', make_dict), ('namedtuple', TupleDate),
+                          ('dataclass', DataDate), ('Date', Date), ('record', FastDate)):
+        # Memory and speed are measured in separate passes, since tracemalloc slows
+        # down every allocation, and the types that allocate the most the most
+        tracemalloc.start()
+        items = [factory(*row) for row in rows]
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del items
+        start = time.perf_counter()
+        items = [factory(*row) for row in rows]
+        elapsed = time.perf_counter() - start
+        print('{:12} {:6.1f} bytes/record   {:.3f} usec/record'.format(
+            name, size / n, elapsed / n * 1e6))
+        del items
+    tracemalloc.start()
+    dates = FastDate.Array(FastDate(*row) for row in rows)
+    print('{:12} {:6.1f} bytes/record'.format(
+        'record.Array', tracemalloc.get_traced_memory()[0] / n))
+    tracemalloc.stop()
+
+
+def _benchmark_date_array(n=1000000):
+    import random
+    import time
+    import tracemalloc
+
+    rows = [(random.randint(1900, 2100), random.randint(1, 12), random.randint(1, 28))
+            for _ in range(n)]
+    tracemalloc.start()
+    objects = [Date(*row) for row in rows]
+    print('Date objects: {:6.1f} bytes/date'.format(tracemalloc.get_traced_memory()[0] / n))
+    tracemalloc.stop()
+    tracemalloc.start()
+    dates = DateArray.from_dates(objects)
+    print('DateArray:    {:6.1f} bytes/date'.format(tracemalloc.get_traced_memory()[0] / n))
+    tracemalloc.stop()
+
+    cutoff = Date(2000, 1, 1)
+    start = time.perf_counter()
+    count = sum(1 for d in objects if (d.year, d.month, d.day) < (2000, 1, 1))
+    print('count before 2000, objects:   {:.3f} sec ({})'.format(time.perf_counter() - start, count))
+    start = time.perf_counter()
+    dates.keys()
+    print('build sort keys, DateArray:   {:.3f} sec'.format(time.perf_counter() - start))
+    start = time.perf_counter()
+    count = sum(dates < cutoff)
+    print('count before 2000, DateArray: {:.3f} sec ({})'.format(time.perf_counter() - start, count))
+    start = time.perf_counter()
+    dates.sorted()
+    print('sort, DateArray:              {:.3f} sec'.format(time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    _benchmark()
+    _benchmark_date_array()
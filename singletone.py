@@ -28,4 +28,227 @@ True
 >>> a is c
 True
 >>>
-"""
\ No newline at end of file
+"""
+
+
+"""
+There is a race in Singleton.__call__(): two threads can both see that no instance
+exists yet, and both go on to create one. That is harmless for Spam, but not for a
+singleton that owns a connection pool or loads a model. Another problem shows up with
+multiprocessing: after os.fork(), the child process inherits the instance along with its
+sockets and threads, which are not usable in the child.
+
+The version below uses double-checked locking. Once the instance exists, __call__()
+returns it without taking the lock; the lock is only used while the instance is being
+created. All singleton classes are tracked, so that a hook registered with
+os.register_at_fork() can drop their instances in child processes, which then build
+their own on first use. reset() does the same for a single class, which is handy in
+tests:
+"""
+
+
+import importlib
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Singleton(type):
+    _classes = weakref.WeakSet()
+    # Registry of lazily imported singletons: name -> 'module:ClassName'
+    _lazy = {}
+    _resolved = {}
+    # Time spent importing and constructing each singleton, in seconds. Like _classes,
+    # these don't keep the classes alive.
+    _import_times = weakref.WeakKeyDictionary()
+    _init_times = weakref.WeakKeyDictionary()
+
+    def __init__(self, *args, **kwargs):
+        self.__instance = None
+        self.__lock = threading.RLock()
+        super().__init__(*args, **kwargs)
+        Singleton._classes.add(self)
+
+    def __call__(self, *args, **kwargs):
+        instance = self.__instance
+        if instance is not None:
+            return instance
+        with self.__lock:
+            # Check again: another thread may have created it while we waited
+            if self.__instance is None:
+                start = time.perf_counter()
+                self.__instance = super().__call__(*args, **kwargs)
+                Singleton._init_times[self] = time.perf_counter() - start
+            return self.__instance
+
+    def reset(self):
+        with self.__lock:
+            self.__instance = None
+
+    @staticmethod
+    def _after_fork():
+        # The child has a single thread, so locks held by other threads at the time
+        # of the fork would never be released. Replace them along with the instances.
+        for cls in list(Singleton._classes):
+            cls.__lock = threading.RLock()
+            cls.__instance = None
+
+
+    # Lazy registry
+
+    @staticmethod
+    def register_lazy(name, path):
+        """
+        Register a singleton class by 'module:ClassName' without importing it
+        """
+        Singleton._lazy[name] = path
+
+    @staticmethod
+    def lazy(name):
+        """
+        A proxy that imports and builds the named singleton on first attribute access
+        """
+        if name not in Singleton._lazy:
+            raise KeyError(name)
+        return SingletonProxy(name)
+
+    @staticmethod
+    def resolve(name):
+        cls = Singleton._resolved.get(name)
+        if cls is None:
+            module_name, _, qualname = Singleton._lazy[name].partition(':')
+            start = time.perf_counter()
+            obj = importlib.import_module(module_name)
+            for attr in qualname.split('.'):
+                obj = getattr(obj, attr)
+            Singleton._import_times[obj] = time.perf_counter() - start
+            cls = Singleton._resolved[name] = obj
+        return cls
+
+    @staticmethod
+    def instance(name):
+        return Singleton.resolve(name)()
+
+    @staticmethod
+    def warm_up(names=None, parallel=True, max_workers=None):
+        """
+        Build the named singletons (by default, all registered ones) ahead of time.
+        Returns the init time of each one.
+        """
+        names = list(Singleton._lazy if names is None else names)
+        if parallel:
+            with ThreadPoolExecutor(max_workers) as pool:
+                list(pool.map(Singleton.instance, names))
+        else:
+            for name in names:
+                Singleton.instance(name)
+        return {name: Singleton._init_times.get(Singleton.resolve(name)) for name in names}
+
+    @staticmethod
+    def report():
+        """
+        (class name, import time, init time) for every singleton built so far,
+        slowest first
+        """
+        rows = [('{}.{}'.format(cls.__module__, cls.__qualname__),
+                 Singleton._import_times.get(cls), init_time)
+                for cls, init_time in list(Singleton._init_times.items())]
+        rows.sort(key=lambda row: (row[1] or 0) + row[2], reverse=True)
+        return rows
+
+
+class SingletonProxy:
+    __slots__ = ['_name']
+
+    def __init__(self, name):
+        object.__setattr__(self, '_name', name)
+
+    def __getattr__(self, attr):
+        return getattr(Singleton.instance(self._name), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(Singleton.instance(self._name), attr, value)
+
+    def __delattr__(self, attr):
+        delattr(Singleton.instance(self._name), attr)
+
+    def __repr__(self):
+        return '<SingletonProxy {!r}>'.format(self._name)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=Singleton._after_fork)
+
+
+# Example
+class Spam(metaclass=Singleton):
+    def __init__(self):
+        print('Creating Spam')
+
+
+"""
+It works just like before:
+>>> a = Spam()
+Creating Spam
+>>> a is Spam()
+True
+>>> Spam.reset()
+>>> b = Spam()
+Creating Spam
+>>> a is b
+False
+>>>
+"""
+
+
+"""
+A service with many singletons whose __init__() does heavy work (opening pools, loading
+models) pays for all of them at startup, even for those that a particular run never
+uses. The registry above defers both the import of the module that defines a singleton
+and its construction. Register each one by name instead of importing it, and hand out
+proxies:
+
+    Singleton.register_lazy('models', 'service.models:ModelRegistry')
+    Singleton.register_lazy('db', 'service.db:ConnectionPool')
+
+    models = Singleton.lazy('models')     # Nothing imported or built yet
+    models.predict(data)                  # Imports service.models, builds it, calls it
+
+If you know which singletons will be needed, warm_up() can build them in a thread pool
+while the rest of the program starts (singletons whose __init__() releases the GIL, e.g.
+for I/O, are built concurrently), and report() lists how long each import and
+construction took:
+
+    Singleton.warm_up(['models', 'db'])
+    for name, import_time, init_time in Singleton.report():
+        print(name, import_time, init_time)
+
+Every attribute access through a proxy goes through the registry, so in hot code fetch
+the real object once with Singleton.instance(name). Singletons that depend on each other
+should be warmed up in the same call or in dependency order; two singletons whose
+__init__() methods each create the other can deadlock when built from different threads.
+"""
+
+
+def _benchmark(number=1000000):
+    from timeit import timeit
+
+    class Quiet(metaclass=Singleton):
+        pass
+
+    Quiet()
+    instance = Quiet()
+
+    def get_instance():
+        return instance
+
+    print('Singleton access:            {:.3f} usec'.format(
+        timeit(Quiet, number=number) / number * 1e6))
+    print('function returning a global: {:.3f} usec'.format(
+        timeit(get_instance, number=number) / number * 1e6))
+
+
+if __name__ == '__main__':
+    _benchmark()